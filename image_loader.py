@@ -1,13 +1,22 @@
 # image_loader.py
 
 import os
+import struct
+import logging
+import threading
 import warnings
 import json
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import cv2
 import pydicom
 import nibabel as nib
 from PIL import Image, ImageFile
 
+log = logging.getLogger(__name__)
+
 warnings.filterwarnings("ignore", category=UserWarning, module="pydicom")
 warnings.simplefilter("ignore", Image.DecompressionBombWarning)
 Image.MAX_IMAGE_PIXELS = None  # allow very large images
@@ -20,6 +29,41 @@ except ImportError:
     openslide = None
     OPENSLIDE_AVAILABLE = False
 
+# Optional tiffslide (tifffile + zarr) for TIFF-based WSIs; faster and avoids OpenSlide's cache leak
+try:
+    import tiffslide
+    TIFFSLIDE_AVAILABLE = True
+except ImportError:
+    tiffslide = None
+    TIFFSLIDE_AVAILABLE = False
+
+WSI_AVAILABLE = OPENSLIDE_AVAILABLE or TIFFSLIDE_AVAILABLE
+
+# Optional tifffile (+ imagecodecs) for LZW/deflate/JPEG TIFF pages; releases the GIL
+try:
+    import tifffile
+    TIFFFILE_AVAILABLE = True
+except ImportError:
+    tifffile = None
+    TIFFFILE_AVAILABLE = False
+
+# Optional pylibjpeg decoders (libjpeg-turbo / OpenJPEG) for compressed DICOM
+try:
+    import pylibjpeg  # noqa: F401
+    PYLIBJPEG_AVAILABLE = True
+except ImportError:
+    PYLIBJPEG_AVAILABLE = False
+
+# Uncompressed DICOM files at least this large are memory-mapped instead of read into RAM
+MEMMAP_MIN_BYTES = 100 * 1024 * 1024
+
+# Header-only reads leave element values larger than this on disk until accessed
+# (embedded PDFs / ICC profiles / private blobs are never needed for metadata)
+HEADER_DEFER_SIZE = "1 KB"
+
+# Worker threads for per-file DICOM reads and WSI tile reads (I/O + decode release the GIL)
+MAX_IO_WORKERS = min(16, os.cpu_count() or 1)
+
 
 # ---------------------------------------------------------
 # Small helpers
@@ -41,40 +85,593 @@ def _safe_int(x, default=0) -> int:
     except Exception:
         return int(default)
 
+def _pil_to_gray_u8(img) -> np.ndarray:
+    """
+    PIL image -> (H, W) uint8 luma.
+    RGB/RGBA go through OpenCV's SIMD cvtColor (same 0.299/0.587/0.114
+    weights as Pillow's "L" conversion); other modes fall back to Pillow.
+    """
+    if img.mode == "L":
+        return np.asarray(img)
+    if img.mode == "RGB":
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2GRAY)
+    if img.mode == "RGBA":
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGBA2GRAY)
+    return np.asarray(img.convert("L"))
+
+def _pil_to_rgb_u8(img) -> np.ndarray:
+    """PIL image -> (H, W, 3) uint8, without a copy when it is already RGB."""
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+# uint8 -> float32 is a 256-entry table gather (cv2.LUT) rather than a per-pixel convert
+_U8_F32_LUT = np.arange(256, dtype=np.float32)
+
+def _u8_to_f32(arr: np.ndarray) -> np.ndarray:
+    if arr.dtype == np.uint8 and arr.ndim in (2, 3):
+        return cv2.LUT(arr, _U8_F32_LUT)
+    return arr.astype(np.float32)
+
 def _dicom_has_pixels(ds) -> bool:
     try:
-        return hasattr(ds, "PixelData") and ds.get("Rows", None) is not None and ds.get("Columns", None) is not None
+        # "in" does not trigger loading of deferred PixelData
+        return "PixelData" in ds and ds.get("Rows", None) is not None and ds.get("Columns", None) is not None
     except Exception:
         return False
 
-def _series_sort_key(ds_h, filename_fallback=""):
+def _ybr_full_to_rgb(arr):
+    """8-bit YBR_FULL (Y, Cb, Cr) -> RGB via OpenCV's SIMD YCrCb conversion."""
+    shape = arr.shape
+    # Fancy indexing reorders to OpenCV's Y, Cr, Cb and yields a contiguous copy;
+    # frames are stacked vertically so one cvtColor call covers them all
+    ycrcb = arr.reshape(-1, shape[-2], 3)[..., [0, 2, 1]]
+    rgb = cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2RGB)
+    return rgb.reshape(shape)
+
+def _dicom_color_pixels(ds, index=None, plugin=""):
+    """
+    Decode 8-bit YBR_FULL / YBR_FULL_422 data without pydicom's numpy colour
+    conversion and convert with cv2 instead. Returns None when the dataset is
+    not such data (or pydicom cannot decode it raw), so callers fall back.
+    """
+    try:
+        if int(ds.get("SamplesPerPixel", 1)) != 3 or int(ds.get("BitsAllocated", 0)) != 8:
+            return None
+        if not str(ds.get("PhotometricInterpretation", "")).startswith("YBR_FULL"):
+            return None
+        from pydicom.pixels import get_decoder
+        decoder = get_decoder(ds.file_meta.TransferSyntaxUID)
+        arr, meta = decoder.as_array(ds, index=index, raw=True, decoding_plugin=plugin)
+    except Exception:
+        return None
+    if arr.dtype != np.uint8 or arr.shape[-1] != 3:
+        return None
+    # Some JPEG decoders already return RGB; only convert what is still YBR
+    if str(meta.get("photometric_interpretation", "")).startswith("YBR_FULL"):
+        arr = _ybr_full_to_rgb(arr)
+    return arr
+
+def _dicom_pixels(ds, index=None):
+    """
+    ds.pixel_array, preferring the pylibjpeg plugin for compressed transfer
+    syntaxes when it is installed (much faster than the Pillow path).
+    With index set, only that frame of a multi-frame dataset is decoded.
+    8-bit YBR colour data (ultrasound) is converted to RGB with cv2.
+    Falls back to pydicom's automatic plugin choice if pylibjpeg cannot decode it.
+    """
+    plugin = ""
+    if PYLIBJPEG_AVAILABLE:
+        try:
+            if ds.file_meta.TransferSyntaxUID.is_compressed:
+                plugin = "pylibjpeg"
+        except Exception:
+            pass
+    for p in ((plugin, "") if plugin else ("",)):
+        arr = _dicom_color_pixels(ds, index=index, plugin=p)
+        if arr is not None:
+            return arr
+
+    attempts = [{"decoding_plugin": plugin}] if plugin else []
+    if index is not None:
+        attempts = [dict(a, index=index) for a in attempts] + [{"index": index}]
+
+    for opts in attempts:
+        try:
+            ds.pixel_array_options(**opts)
+            return ds.pixel_array
+        except Exception:
+            try:
+                ds.pixel_array_options()
+            except Exception:
+                pass
+
+    arr = ds.pixel_array
+    if index is not None and _safe_int(ds.get("NumberOfFrames", None), default=1) > 1:
+        arr = arr[index]
+    return arr
+
+def _memmap_dicom_pixels(file_path, ds):
     """
-    Robust sorting for DICOM series.
-    Priority:
-      1) ImagePositionPatient (z)
-      2) InstanceNumber
-      3) SliceLocation
-      4) filename
+    Memory-map uncompressed little-endian PixelData straight from the file.
+    ds should be read with defer_size so PixelData has not been loaded.
+    Returns a read-only np.memmap shaped like ds.pixel_array, or None if the
+    layout is not a plain monochrome integer buffer.
     """
-    z = None
+    try:
+        ts = ds.file_meta.TransferSyntaxUID
+        if ts.is_compressed or ts.is_deflated or not ts.is_little_endian:
+            return None
+
+        rows = _safe_int(ds.get("Rows", None), default=0)
+        cols = _safe_int(ds.get("Columns", None), default=0)
+        nframes = _safe_int(ds.get("NumberOfFrames", None), default=1)
+        bits = _safe_int(ds.get("BitsAllocated", None), default=0)
+        bits_stored = _safe_int(ds.get("BitsStored", None), default=bits)
+        signed = _safe_int(ds.get("PixelRepresentation", None), default=0) == 1
+        spp = _safe_int(ds.get("SamplesPerPixel", None), default=1)
+
+        if rows <= 0 or cols <= 0 or spp != 1 or bits not in (8, 16, 32):
+            return None
+        # Signed data with unused high bits needs sign extension; let pydicom do it
+        if signed and bits_stored != bits:
+            return None
+
+        dtype = np.dtype(f"<{'i' if signed else 'u'}{bits // 8}")
+        shape = (nframes, rows, cols) if nframes > 1 else (rows, cols)
+
+        elem = ds.get_item(0x7FE00010, keep_deferred=True)
+        expected = int(np.prod(shape)) * dtype.itemsize
+        if elem is None or elem.length < expected:
+            return None
+
+        return np.memmap(file_path, dtype=dtype, mode="r", offset=elem.value_tell, shape=shape)
+    except Exception:
+        return None
+
+
+def _read_dicom_with_pixels(file_path):
+    """
+    Read a DICOM file and its raw pixel array.
+    Large uncompressed files are memory-mapped (no full read + copy into RAM);
+    everything else goes through pydicom's decoders.
+    Returns (dataset, raw pixel array).
+    """
+    try:
+        big = os.path.getsize(file_path) >= MEMMAP_MIN_BYTES
+    except OSError:
+        big = False
+
+    if big:
+        ds = pydicom.dcmread(file_path, defer_size="100 KB", force=True)
+        if not _dicom_has_pixels(ds):
+            raise RuntimeError("DICOM has no PixelData to display.")
+        raw = _memmap_dicom_pixels(file_path, ds)
+        if raw is not None:
+            return ds, raw
+    else:
+        ds = pydicom.dcmread(file_path, force=True)
+        if not _dicom_has_pixels(ds):
+            raise RuntimeError("DICOM has no PixelData to display.")
+
+    return ds, _dicom_pixels(ds)
+
+
+def _is_monochrome1(ds) -> bool:
+    pi = getattr(ds, "PhotometricInterpretation", "")
+    return isinstance(pi, str) and pi.strip().upper() == "MONOCHROME1"
+
+def _rescale_to_float32(raw, slope, intercept, mono1=False, out=None):
+    """
+    Apply raw * slope + intercept (and MONOCHROME1 inversion) as a single
+    affine map written straight into a float32 buffer (``out`` if given,
+    e.g. one slice of a preallocated volume; an int16 ``out`` is only used
+    when the results are known to be integers in range).
+    MONOCHROME1: max(y) - y with y = raw*s + i  ==  raw*(-s) + ext*s,
+    where ext is max(raw) for s >= 0 (min(raw) otherwise).
+    """
+    slope = float(slope)
+    intercept = float(intercept)
+    if mono1:
+        ext = float(raw.max() if slope >= 0 else raw.min())
+        slope, intercept = -slope, ext * slope
+
+    if out is None:
+        out = np.empty(raw.shape, dtype=np.float32)
+    np.multiply(raw, np.float32(slope), out=out, dtype=np.float32, casting="unsafe")
+    if intercept != 0.0:
+        np.add(out, np.float32(intercept), out=out, casting="unsafe")
+    return out
+
+def _image_position(ds_h):
+    """ImagePositionPatient as a float (x, y, z) tuple, or None."""
     try:
         ipp = getattr(ds_h, "ImagePositionPatient", None)
         if ipp is not None and len(ipp) >= 3:
-            z = float(ipp[2])
+            return float(ipp[0]), float(ipp[1]), float(ipp[2])
     except Exception:
-        z = None
+        pass
+    return None
+
+
+def _series_sort_fields(ds_h):
+    """
+    Sort fields for one DICOM slice header: (z_flag, z, InstanceNumber, SliceLocation).
+    z_flag is 1 when ImagePositionPatient is missing (so those slices sort last).
+    """
+    ipp = _image_position(ds_h)
+    z = ipp[2] if ipp is not None else None
 
     inst = _safe_int(getattr(ds_h, "InstanceNumber", None), default=10**9)
     sl = _safe_float(getattr(ds_h, "SliceLocation", None), default=0.0)
 
     # Put None z at the end
-    z_key = (0, z) if z is not None else (1, 0.0)
-    return (z_key, inst, sl, filename_fallback)
+    if z is None:
+        return 1, 0.0, inst, sl
+    return 0, z, inst, sl
+
+
+# ---------------------------------------------------------
+# Result caches (keyed by path + mtime + size)
+# ---------------------------------------------------------
+# Guards the small LRU dicts below; the folder scan (main.py) and the series
+# loader fill them from worker threads
+_CACHE_LOCK = threading.RLock()
+_DETECT_CACHE = OrderedDict()
+DETECT_CACHE_MAX = 128  # (type, metadata string) pairs are small
+_LOADER_CACHE = OrderedDict()
+LOADER_CACHE_MAX = 2  # decoded volumes can be large; keep only the last few
+_HEADER_CACHE = OrderedDict()
+HEADER_CACHE_MAX = 32  # header-only DICOM datasets (no PixelData)
+
+_UID_CACHE = OrderedDict()
+UID_CACHE_MAX = 4096  # SeriesInstanceUID strings, one per DICOM file
+
+
+def _file_key(file_path):
+    """Cache key that changes whenever the file is rewritten."""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return None
+    return (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+
+
+def _dir_key(dir_path):
+    """
+    (name, mtime_ns, size) of every file in a folder, so the key changes when
+    any member is added, removed or rewritten in place.
+    """
+    entries = []
+    try:
+        with os.scandir(dir_path) as it:
+            for e in it:
+                try:
+                    if e.is_file():
+                        st = e.stat()
+                        entries.append((e.name, st.st_mtime_ns, st.st_size))
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    return tuple(sorted(entries))
+
+
+def _freeze(result):
+    """Mark cached arrays read-only so callers cannot corrupt the cache."""
+    items = result if isinstance(result, tuple) else (result,)
+    for x in items:
+        if isinstance(x, np.ndarray):
+            x.flags.writeable = False
+    return result
+
+
+def _cache_by_file(include_dir=False):
+    """
+    Memoize a loader on (file key, args). With include_dir=True the stats of
+    every file in the parent folder are part of the key (e.g. a DICOM series
+    spans the folder).
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(file_path, *args, **kwargs):
+            fkey = _file_key(file_path)
+            if fkey is None:
+                return fn(file_path, *args, **kwargs)
+            dkey = _dir_key(os.path.dirname(fkey[0])) if include_dir else None
+            key = (fn.__name__, fkey, dkey, args, tuple(sorted(kwargs.items())))
+
+            with _CACHE_LOCK:
+                if key in _LOADER_CACHE:
+                    _LOADER_CACHE.move_to_end(key)
+                    return _LOADER_CACHE[key]
+
+            result = _freeze(fn(file_path, *args, **kwargs))
+            with _CACHE_LOCK:
+                _LOADER_CACHE[key] = result
+                while len(_LOADER_CACHE) > LOADER_CACHE_MAX:
+                    _LOADER_CACHE.popitem(last=False)
+            return result
+        return wrapper
+    return deco
+
+
+def _dicom_header(file_path):
+    """
+    Header-only DICOM read (stop_before_pixels), memoized per file key so
+    detection and the loaders parse the selected file's header once.
+    Raises like pydicom.dcmread; callers must not modify the dataset.
+    """
+    key = _file_key(file_path)
+    if key is not None:
+        with _CACHE_LOCK:
+            if key in _HEADER_CACHE:
+                _HEADER_CACHE.move_to_end(key)
+                return _HEADER_CACHE[key]
+
+    ds = pydicom.dcmread(file_path, stop_before_pixels=True, defer_size=HEADER_DEFER_SIZE, force=True)
+    if key is not None:
+        with _CACHE_LOCK:
+            _HEADER_CACHE[key] = ds
+            while len(_HEADER_CACHE) > HEADER_CACHE_MAX:
+                _HEADER_CACHE.popitem(last=False)
+    return ds
+
+
+_SERIES_UID_TAG = 0x0020000E
+
+
+def _past_series_uid(tag, vr, length) -> bool:
+    return tag > _SERIES_UID_TAG
+
+
+def get_dicom_series_uid(file_path):
+    """
+    SeriesInstanceUID of a DICOM file as str (None if the tag is missing).
+    Memoized per file key, so rescanning a folder does not reopen its slices.
+    Raises like pydicom.dcmread for unreadable files.
+    """
+    key = _file_key(file_path)
+    if key is not None:
+        with _CACHE_LOCK:
+            if key in _UID_CACHE:
+                _UID_CACHE.move_to_end(key)
+                return _UID_CACHE[key]
+
+    # Elements are stored in tag order, so parsing stops at the first tag after
+    # (0020,000E): later groups (private CSA headers, sequences, pixels) are never read
+    with open(file_path, "rb") as fp:
+        ds = pydicom.filereader.read_partial(
+            fp,
+            stop_when=_past_series_uid,
+            defer_size=HEADER_DEFER_SIZE,
+            force=True,
+            specific_tags=[_SERIES_UID_TAG],
+        )
+    uid = ds.get("SeriesInstanceUID", None)
+    uid = str(uid) if uid else None
+    if key is not None:
+        with _CACHE_LOCK:
+            _UID_CACHE[key] = uid
+            while len(_UID_CACHE) > UID_CACHE_MAX:
+                _UID_CACHE.popitem(last=False)
+    return uid
+
+
+def clear_caches(paths=None):
+    """
+    Drop cached results and close cached slide handles. With paths, only the
+    entries for those files are released; other viewers keep theirs.
+    """
+    with _CACHE_LOCK:
+        if paths is None:
+            _DETECT_CACHE.clear()
+            _HEADER_CACHE.clear()
+            _UID_CACHE.clear()
+            _LOADER_CACHE.clear()
+            slides = list(_SLIDE_CACHE.values())
+            _SLIDE_CACHE.clear()
+        else:
+            wanted = {os.path.abspath(p) for p in paths}
+            for cache in (_DETECT_CACHE, _HEADER_CACHE, _UID_CACHE):
+                for key in [k for k in cache if k[0] in wanted]:
+                    del cache[key]
+            for key in [k for k in _LOADER_CACHE if k[1][0] in wanted]:
+                del _LOADER_CACHE[key]
+            stale = [k for k in _SLIDE_CACHE if k[0] in wanted]
+            slides = [_SLIDE_CACHE.pop(k) for k in stale]
+    for slide in slides:
+        try:
+            slide.close()
+        except Exception:
+            pass
 
 
 # ---------------------------------------------------------
 # File type detection + metadata string
 # ---------------------------------------------------------
+WSI_EXTS = [".svs", ".scn", ".mrxs", ".ndpi", ".vms", ".bif"]
+
+_TIFF_MAGICS = (b"II*\x00", b"MM\x00*", b"II+\x00", b"MM\x00+")
+_NIFTI_MAGICS = (b"n+1\x00", b"ni1\x00")
+
+
+def _is_nifti_path(file_path: str) -> bool:
+    p = file_path.lower()
+    return p.endswith(".nii") or p.endswith(".nii.gz")
+
+
+def _sniff_file_type(file_path):
+    """
+    Guess the file type from the first bytes of the file (one small read).
+    Returns one of "DICOM", "NIfTI", "JPEG/PNG", "TIFF" or None if unsure.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            head = f.read(512)
+    except OSError:
+        return None
+
+    if head[128:132] == b"DICM":
+        return "DICOM"
+    if head.startswith(b"\x89PNG"):
+        return "JPEG/PNG"
+    if head[:3] == b"\xff\xd8\xff":
+        return "JPEG/PNG"
+    if head[:4] in _TIFF_MAGICS:
+        return "TIFF"
+
+    if _is_nifti_path(file_path):
+        # .nii header magic at offset 344; .nii.gz is gzip-compressed
+        if head[344:348] in _NIFTI_MAGICS:
+            return "NIfTI"
+        if head[:2] == b"\x1f\x8b":
+            return "NIfTI"
+
+    return None
+
+
+_WSI_DESC_KEYWORDS = ("Aperio", "Hamamatsu", "Philips", "Leica", "openslide")
+_TIFF_DESC_MAX = 64 * 1024
+
+
+def _tiff_image_description(file_path):
+    """
+    ImageDescription (tag 270) of the first IFD, parsed by hand from the
+    TIFF/BigTIFF header. Returns "" if the file is not TIFF or has no tag.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(16)
+        if head[:4] not in _TIFF_MAGICS:
+            return ""
+        bo = "<" if head[:2] == b"II" else ">"
+        if head[2:4] in (b"*\x00", b"\x00*"):
+            ifd = struct.unpack(bo + "I", head[4:8])[0]
+            count_fmt, entry_fmt, entry_size, inline = "H", "HHII", 12, 4
+        else:
+            ifd = struct.unpack(bo + "Q", head[8:16])[0]
+            count_fmt, entry_fmt, entry_size, inline = "Q", "HHQQ", 20, 8
+
+        f.seek(ifd)
+        n_raw = f.read(struct.calcsize(count_fmt))
+        if len(n_raw) < struct.calcsize(count_fmt):
+            return ""
+        n = struct.unpack(bo + count_fmt, n_raw)[0]
+        entries = f.read(n * entry_size)
+        for i in range(len(entries) // entry_size):
+            e = entries[i * entry_size:(i + 1) * entry_size]
+            tag, _typ, count, value = struct.unpack(bo + entry_fmt, e)
+            if tag != 270:
+                continue
+            if count <= inline:
+                raw = e[-inline:][:count]
+            else:
+                f.seek(value)
+                raw = f.read(min(count, _TIFF_DESC_MAX))
+            return raw.split(b"\x00", 1)[0].decode("latin-1", "replace")
+    return ""
+
+
+def _looks_like_wsi(file_path) -> bool:
+    """Cheap check before opening an unknown file with OpenSlide/tiffslide."""
+    try:
+        desc = _tiff_image_description(file_path)
+    except (OSError, struct.error):
+        return False
+    return any(k in desc for k in _WSI_DESC_KEYWORDS)
+
+
+def _detect_wholeslide(file_path):
+    slide = _open_slide_cached(file_path)
+    dims = slide.dimensions
+    meta_str = (
+        "===== Whole Slide Image =====\n"
+        f"Dimensions: {dims}\n"
+        f"Levels: {slide.level_count}\n"
+        f"Level Dimensions: {slide.level_dimensions}\n"
+        f"Vendor: {_slide_vendor(slide)}\n"
+        "=============================\n"
+    )
+    return "WHOLESLIDE", meta_str
+
+
+def _dicom_shape_from_header(ds):
+    """Pixel array shape as pydicom would report it, derived from header tags only."""
+    rows = _safe_int(ds.get("Rows", None), default=0)
+    cols = _safe_int(ds.get("Columns", None), default=0)
+    if rows <= 0 or cols <= 0:
+        return ("?", "?")
+    shape = (rows, cols)
+    nframes = _safe_int(ds.get("NumberOfFrames", None), default=1)
+    if nframes > 1:
+        shape = (nframes,) + shape
+    spp = _safe_int(ds.get("SamplesPerPixel", None), default=1)
+    if spp > 1:
+        shape = shape + (spp,)
+    return shape
+
+
+def _detect_dicom(file_path):
+    # Header only: pixel decoding happens once, inside the loader
+    ds = _dicom_header(file_path)
+    if not ds or ds.get("Rows", None) is None or ds.get("Columns", None) is None:
+        return None
+    shape = _dicom_shape_from_header(ds)
+    meta_str = (
+        "===== DICOM Info =====\n"
+        f"Patient Name: {ds.get('PatientName', 'Unknown')}\n"
+        f"Study ID: {ds.get('StudyID', 'N/A')}\n"
+        f"Modality: {ds.get('Modality', 'N/A')}\n"
+        f"SeriesInstanceUID: {getattr(ds, 'SeriesInstanceUID', 'N/A')}\n"
+        f"Shape: {shape}\n"
+        "=======================\n"
+    )
+    return "DICOM", meta_str
+
+
+def _detect_nifti(file_path):
+    nii = nib.load(file_path)
+    shape = nii.shape
+    hdr = nii.header
+    meta_str = (
+        "===== NIfTI Info =====\n"
+        f"{hdr}\n"
+        f"Shape: {shape}\n"
+        f"Dim: {len(shape)}D\n"
+        "======================\n"
+    )
+    return "NIfTI", meta_str
+
+
+def _detect_pillow(file_path):
+    # Image.open only parses the header; no verify() pass over the whole file
+    with Image.open(file_path) as img:
+        img_format = img.format
+    if img_format in ["JPEG", "PNG"]:
+        meta_str = (
+            "===== JPEG/PNG Info =====\n"
+            "2D standard image.\n"
+            "=========================\n"
+        )
+        return "JPEG/PNG", meta_str
+    elif img_format == "TIFF":
+        meta_str = (
+            "===== TIFF Info =====\n"
+            "Possibly multi-page or single-page.\n"
+            "=========================\n"
+        )
+        return "TIFF", meta_str
+    return None
+
+
+_DETECTORS = {
+    "DICOM": _detect_dicom,
+    "NIfTI": _detect_nifti,
+    "JPEG/PNG": _detect_pillow,
+    "TIFF": _detect_pillow,
+}
+
+
 def detect_file_type_and_metadata(file_path):
     """
     Detect if a file is:
@@ -84,115 +681,65 @@ def detect_file_type_and_metadata(file_path):
       - TIFF
       - WHOLESLIDE (.svs, .scn, etc. via OpenSlide)
       or unknown.
+
+    The file header is sniffed first (magic bytes), so only the matching
+    parser is run instead of trying every library in turn.
+    Results are cached per (path, mtime, size).
     Returns: (file_type, meta_str)
     """
+    key = _file_key(file_path)
+    if key is not None:
+        with _CACHE_LOCK:
+            if key in _DETECT_CACHE:
+                _DETECT_CACHE.move_to_end(key)
+                return _DETECT_CACHE[key]
 
-    print("\nLoading... Please wait while we identify the file type.")
-    print(f"[DEBUG] Checking file: {file_path}")
+    res = _detect_file_type_and_metadata_uncached(file_path)
+    if key is not None:
+        with _CACHE_LOCK:
+            _DETECT_CACHE[key] = res
+            while len(_DETECT_CACHE) > DETECT_CACHE_MAX:
+                _DETECT_CACHE.popitem(last=False)
+    return res
+
+
+def _detect_file_type_and_metadata_uncached(file_path):
+    log.debug("Identifying file type: %s", file_path)
 
     ext = os.path.splitext(file_path)[1].lower()
 
-    # 1) If extension suggests a WSI, try OpenSlide first
-    if OPENSLIDE_AVAILABLE and ext in [".svs", ".scn", ".mrxs", ".ndpi", ".vms", ".bif"]:
-        print("[DEBUG] Attempting OpenSlide read by extension:", ext)
+    # 1) If extension suggests a WSI, try OpenSlide first (SVS etc. are TIFF-based)
+    if WSI_AVAILABLE and ext in WSI_EXTS:
         try:
-            slide = openslide.OpenSlide(file_path)
-            dims = slide.dimensions
-            meta_str = (
-                "===== Whole Slide Image =====\n"
-                f"Dimensions: {dims}\n"
-                f"Levels: {slide.level_count}\n"
-                f"Level Dimensions: {slide.level_dimensions}\n"
-                f"Vendor: {slide.properties.get('openslide.vendor', 'Unknown')}\n"
-                "=============================\n"
-            )
-            return "WHOLESLIDE", meta_str
+            return _detect_wholeslide(file_path)
         except Exception as e:
-            print(f"[DEBUG] OpenSlide read by extension failed: {e}")
+            log.debug("OpenSlide read by extension failed: %s", e)
 
-    # 2) Try DICOM (header + pixels, because some files lie)
-    try:
-        print("[DEBUG] Attempting DICOM read...")
-        ds = pydicom.dcmread(file_path, stop_before_pixels=False, force=True)
-        if ds and _dicom_has_pixels(ds):
-            # pixel_array access can throw; guard it
-            try:
-                shape = ds.pixel_array.shape
-            except Exception:
-                shape = ("?", "?")
-            meta_str = (
-                "===== DICOM Info =====\n"
-                f"Patient Name: {ds.get('PatientName', 'Unknown')}\n"
-                f"Study ID: {ds.get('StudyID', 'N/A')}\n"
-                f"Modality: {ds.get('Modality', 'N/A')}\n"
-                f"SeriesInstanceUID: {getattr(ds, 'SeriesInstanceUID', 'N/A')}\n"
-                f"Shape: {shape}\n"
-                "=======================\n"
-            )
-            return "DICOM", meta_str
-    except Exception as e:
-        print(f"[DEBUG] DICOM read failed: {e}")
-
-    # 3) Try NIfTI (only if extension matches)
-    try:
-        print("[DEBUG] Attempting NIfTI read...")
-        if not (file_path.lower().endswith(".nii") or file_path.lower().endswith(".nii.gz")):
-            raise RuntimeError("Not a NIfTI extension")
-        nii = nib.load(file_path)
-        if nii:
-            shape = nii.shape
-            hdr = nii.header
-            meta_str = (
-                "===== NIfTI Info =====\n"
-                f"{hdr}\n"
-                f"Shape: {shape}\n"
-                f"Dim: {len(shape)}D\n"
-                "======================\n"
-            )
-            return "NIfTI", meta_str
-    except Exception as e:
-        print(f"[DEBUG] NIfTI read failed: {e}")
+    # 2) Dispatch on magic bytes to the one parser that can read it
+    sniffed = _sniff_file_type(file_path)
+    if sniffed is not None:
+        try:
+            res = _DETECTORS[sniffed](file_path)
+            if res is not None:
+                return res
+        except Exception as e:
+            log.debug("%s read failed: %s", sniffed, e)
 
-    # 4) Try Pillow => PNG/JPG/TIFF
-    try:
-        print("[DEBUG] Attempting Pillow read (PNG/JPG/TIFF)...")
-        with Image.open(file_path) as img:
-            img_format = img.format
-            img.verify()
-        if img_format in ["JPEG", "PNG"]:
-            meta_str = (
-                "===== JPEG/PNG Info =====\n"
-                "2D standard image.\n"
-                "=========================\n"
-            )
-            return "JPEG/PNG", meta_str
-        elif img_format == "TIFF":
-            meta_str = (
-                "===== TIFF Info =====\n"
-                "Possibly multi-page or single-page.\n"
-                "=========================\n"
-            )
-            return "TIFF", meta_str
-    except Exception as e:
-        print(f"[DEBUG] Pillow read failed: {e}")
+    # 3) No recognizable magic: DICOM files may lack the 128-byte preamble
+    if sniffed != "DICOM":
+        try:
+            res = _detect_dicom(file_path)
+            if res is not None:
+                return res
+        except Exception as e:
+            log.debug("DICOM read failed: %s", e)
 
-    # 5) Final fallback: try OpenSlide again as generic WSI check
-    if OPENSLIDE_AVAILABLE:
-        print("[DEBUG] Checking with OpenSlide fallback for WSI.")
+    # 4) Final fallback: a TIFF whose first IFD names a WSI vendor
+    if WSI_AVAILABLE and _looks_like_wsi(file_path):
         try:
-            slide = openslide.OpenSlide(file_path)
-            dims = slide.dimensions
-            meta_str = (
-                "===== Whole Slide Image =====\n"
-                f"Dimensions: {dims}\n"
-                f"Levels: {slide.level_count}\n"
-                f"Level Dimensions: {slide.level_dimensions}\n"
-                f"Vendor: {slide.properties.get('openslide.vendor', 'Unknown')}\n"
-                "=============================\n"
-            )
-            return "WHOLESLIDE", meta_str
+            return _detect_wholeslide(file_path)
         except Exception as e:
-            print(f"[DEBUG] OpenSlide fallback failed: {e}")
+            log.debug("OpenSlide fallback failed: %s", e)
 
     return None, "Error: Unknown or unsupported file format."
 
@@ -205,33 +752,208 @@ def detect_file_type(file_path):
 # ---------------------------------------------------------
 # WSI loader
 # ---------------------------------------------------------
+WSI_TILE = 1024  # read granularity for large levels (pixels)
+# Overview reads touch every tile once, so OpenSlide's default 32 MiB
+# per-handle tile cache would only hold memory; keep it tiny.
+WSI_ONESHOT_CACHE_BYTES = 1 << 20
+
+TIFFSLIDE_EXTS = {".svs", ".tif", ".tiff", ".ndpi"}
+
+
+def _open_slide(file_path, cache_bytes=WSI_ONESHOT_CACHE_BYTES):
+    """
+    Open a WSI with tiffslide for TIFF-based formats when it is installed,
+    otherwise with OpenSlide. Both expose dimensions / level_count /
+    level_dimensions / level_downsamples / read_region / properties / close.
+    cache_bytes sizes the OpenSlide (>= 4) tile cache; None keeps the default.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    if TIFFSLIDE_AVAILABLE and (ext in TIFFSLIDE_EXTS or not OPENSLIDE_AVAILABLE):
+        try:
+            return tiffslide.TiffSlide(file_path)
+        except Exception:
+            if not OPENSLIDE_AVAILABLE:
+                raise
+
+    slide = openslide.OpenSlide(file_path)
+    if cache_bytes is not None and hasattr(openslide, "OpenSlideCache"):
+        try:
+            slide.set_cache(openslide.OpenSlideCache(cache_bytes))
+        except Exception:
+            pass
+    return slide
+
+
+_SLIDE_CACHE = OrderedDict()
+SLIDE_CACHE_MAX = 4
+
+
+def _open_slide_cached(file_path):
+    """
+    _open_slide() memoized per (path, mtime, size) in a small LRU, so detection
+    and loading share one handle (opening parses the whole pyramid directory).
+    Evicted handles are closed.
+    """
+    key = _file_key(file_path)
+    if key is None:
+        return _open_slide(file_path)
+
+    with _CACHE_LOCK:
+        slide = _SLIDE_CACHE.get(key)
+        if slide is not None:
+            _SLIDE_CACHE.move_to_end(key)
+            return slide
+
+    slide = _open_slide(file_path)
+    evicted = []
+    with _CACHE_LOCK:
+        # Another thread may have opened the same slide meanwhile; keep theirs
+        existing = _SLIDE_CACHE.get(key)
+        if existing is not None:
+            evicted.append(slide)
+            slide = existing
+        else:
+            _SLIDE_CACHE[key] = slide
+            while len(_SLIDE_CACHE) > SLIDE_CACHE_MAX:
+                evicted.append(_SLIDE_CACHE.popitem(last=False)[1])
+    for old in evicted:
+        try:
+            old.close()
+        except Exception:
+            pass
+    return slide
+
+
+def _slide_vendor(slide) -> str:
+    props = slide.properties
+    return props.get("openslide.vendor") or props.get("tiffslide.vendor") or "Unknown"
+
+
+def _slide_bounds(slide):
+    """
+    Non-empty region (x, y, w, h) in level-0 pixels when the format records
+    one (e.g. MRXS), else None.
+    """
+    props = slide.properties
+    vals = []
+    for key in ("bounds-x", "bounds-y", "bounds-width", "bounds-height"):
+        v = props.get(f"openslide.{key}") or props.get(f"tiffslide.{key}")
+        if v is None:
+            return None
+        vals.append(_safe_int(v, default=-1))
+    x, y, bw, bh = vals
+    if x < 0 or y < 0 or bw <= 0 or bh <= 0:
+        return None
+    return x, y, bw, bh
+
+
+def _slide_thumbnail(slide):
+    """Precomputed 'thumbnail' associated image (PIL), or None."""
+    try:
+        return slide.associated_images.get("thumbnail")
+    except Exception:
+        return None
+
+
+def _morton_key(tx, ty, bits=16):
+    """Interleave the bits of (tx, ty) into a Z-order (Morton) index."""
+    z = 0
+    for b in range(bits):
+        z |= ((tx >> b) & 1) << (2 * b)
+        z |= ((ty >> b) & 1) << (2 * b + 1)
+    return z
+
+
+def _level_read_tile(slide, level, target=WSI_TILE):
+    """
+    Read granularity (tw, th) for a level: target rounded down to a multiple of
+    the native tile size, so every backing tile is decoded by exactly one read.
+    """
+    props = slide.properties
+    size = []
+    for key in ("tile-width", "tile-height"):
+        native = _safe_int(props.get(f"openslide.level[{level}].{key}", None), default=0)
+        if native <= 0:
+            size.append(target)
+        else:
+            size.append(max(native, (target // native) * native))
+    return size[0], size[1]
+
+
+def _read_level_gray(slide, level, w, h, origin=(0, 0)):
+    """
+    Read a w x h region of a pyramid level (starting at ``origin`` in level-0
+    pixels) as a 2D float32 grayscale array.
+    The level is split into native-tile-aligned chunks that are fetched on a
+    thread pool (OpenSlide is thread-safe and releases the GIL while decoding),
+    submitted in Morton order, and written into one preallocated buffer.
+    """
+    out = np.empty((h, w), dtype=np.float32)
+    downsample = slide.level_downsamples[level]
+    tile_w, tile_h = _level_read_tile(slide, level)
+
+    tiles = [(tx, ty) for ty in range((h + tile_h - 1) // tile_h) for tx in range((w + tile_w - 1) // tile_w)]
+    tiles.sort(key=lambda t: _morton_key(t[0], t[1]))
+
+    def _fetch(t):
+        x0, y0 = t[0] * tile_w, t[1] * tile_h
+        tw, th = min(tile_w, w - x0), min(tile_h, h - y0)
+        # read_region takes level-0 coordinates for the location
+        loc = (origin[0] + int(x0 * downsample), origin[1] + int(y0 * downsample))
+        region = slide.read_region(loc, level, (tw, th))
+        out[y0:y0 + th, x0:x0 + tw] = _pil_to_gray_u8(region)
+
+    if len(tiles) == 1:
+        _fetch(tiles[0])
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as ex:
+            list(ex.map(_fetch, tiles))
+    return out
+
+
+@_cache_by_file()
 def load_whole_slide_downsampled(file_path, max_dim=2048):
     """
-    Use OpenSlide to load a downsampled overview image of a WSI.
+    Use OpenSlide (or tiffslide) to load a downsampled overview image of a WSI.
     Pick lowest-res level whose max dimension <= max_dim if possible.
     Returns a 2D float32 array (grayscale).
     """
-    import openslide
-    slide = openslide.OpenSlide(file_path)
+    # Reuses the handle opened during detection (tiny tile cache, one-shot read)
+    slide = _open_slide_cached(file_path)
+
+    # Only read the non-empty area when the format records it (MRXS)
+    bounds = _slide_bounds(slide)
+
+    def _dims(lvl):
+        if bounds is None:
+            return slide.level_dimensions[lvl]
+        ds = slide.level_downsamples[lvl]
+        return max(1, int(bounds[2] / ds)), max(1, int(bounds[3] / ds))
 
     chosen_level = slide.level_count - 1
     for lvl in range(slide.level_count - 1, -1, -1):
-        w, h = slide.level_dimensions[lvl]
+        w, h = _dims(lvl)
         if max(w, h) <= max_dim:
             chosen_level = lvl
             break
 
-    w, h = slide.level_dimensions[chosen_level]
-    print(f"[DEBUG] load_whole_slide_downsampled: using level {chosen_level} with size {w}x{h}")
-    rgba = slide.read_region((0, 0), chosen_level, (w, h))
-    arr = rgba.convert("L")
-    return np.array(arr, dtype=np.float32)
+    w, h = _dims(chosen_level)
+
+    # The precomputed thumbnail is essentially free to read; use it when it
+    # covers the same area and carries at least as much detail as the level
+    thumb = _slide_thumbnail(slide) if bounds is None else None
+    if thumb is not None and max(w, h) <= max(thumb.size) <= max(max_dim, max(w, h)):
+        log.debug("load_whole_slide_downsampled: using thumbnail %dx%d", *thumb.size)
+        return _u8_to_f32(_pil_to_gray_u8(thumb))
+
+    log.debug("load_whole_slide_downsampled: using level %d with size %dx%d", chosen_level, w, h)
+    origin = (bounds[0], bounds[1]) if bounds is not None else (0, 0)
+    return _read_level_gray(slide, chosen_level, w, h, origin=origin)
 
 
 # ---------------------------------------------------------
 # Basic image loaders
 # ---------------------------------------------------------
-
 def _nifti_to_viewer_axes(arr: np.ndarray) -> np.ndarray:
     """
     Convert NIfTI array from nibabel (X,Y,Z[,T]) into viewer-friendly (H,W,Z[,T])
@@ -246,15 +968,35 @@ def _nifti_to_viewer_axes(arr: np.ndarray) -> np.ndarray:
     return arr
 
 
+def _nifti_voxels(dataobj):
+    """
+    NIfTI voxel array without a get_fdata() float64 copy: the on-disk dtype
+    (memory-mapped for uncompressed files), float32 when scaled or float64.
+    """
+    # Scaled or float64 data: let nibabel apply scl_slope/scl_inter directly in
+    # float32 instead of producing a float64 array and casting it afterwards
+    scaled = nib.is_proxy(dataobj) and (
+        float(getattr(dataobj, "slope", 1.0)) != 1.0
+        or float(getattr(dataobj, "inter", 0.0)) != 0.0
+    )
+    if scaled or dataobj.dtype == np.float64:
+        return np.asanyarray(dataobj, dtype=np.float32)
+    return np.asanyarray(dataobj)
+
+
+@_cache_by_file()
 def load_nifti_with_meta(file_path: str, canonical: bool = True):
     """
     Load NIfTI and optionally reorient to closest canonical (RAS+) using nibabel.
+    Voxel data is not cast to float64: uncompressed files stay memory-mapped
+    (pages are read on access) and keep their on-disk dtype, unless the header
+    scaling requires floats.
     Returns:
-      vol_viewer: float32 array in viewer axes (H,W,Z) or (H,W,Z,T)
+      vol_viewer: array in viewer axes (H,W,Z) or (H,W,Z,T)
       meta_str: human-readable metadata
       meta_dict: dictionary with orientation + voxel sizes + shapes
     """
-    img = nib.load(file_path)
+    img = nib.load(file_path, mmap=True)
 
     # Original orientation codes (from affine)
     try:
@@ -282,8 +1024,7 @@ def load_nifti_with_meta(file_path: str, canonical: bool = True):
             canon_axcodes = orig_axcodes
             canon_vox = orig_vox
 
-    data = img_use.get_fdata().astype(np.float32, copy=False)
-    vol_viewer = _nifti_to_viewer_axes(data)
+    vol_viewer = _nifti_to_viewer_axes(_nifti_voxels(img_use.dataobj))
 
     viewer_vox = None
     if canon_vox and len(canon_vox) >= 3:
@@ -323,6 +1064,14 @@ def load_nifti(file_path):
     vol, _meta_str, _meta = load_nifti_with_meta(file_path, canonical=False)
     return vol
 
+def load_nifti_voxels(file_path):
+    """
+    NIfTI voxels in their on-disk (X, Y, Z[, T]) axis order (no canonical, no
+    viewer transpose), as returned by _nifti_voxels (read-only).
+    """
+    return _nifti_voxels(nib.load(file_path, mmap=True).dataobj)
+
+@_cache_by_file()
 def load_jpeg_png(file_path):
     """
     Load PNG/JPEG preserving color if present.
@@ -332,31 +1081,158 @@ def load_jpeg_png(file_path):
     """
     with Image.open(file_path) as img:
         if img.mode in ("RGB", "RGBA", "P"):
-            img = img.convert("RGB")
-            return np.array(img, dtype=np.float32)
-        img = img.convert("L")
-        return np.array(img, dtype=np.float32)
+            return _u8_to_f32(_pil_to_rgb_u8(img))
+        return _u8_to_f32(_pil_to_gray_u8(img))
 
+def _tifffile_first_page(file_path):
+    """
+    First TIFF page via tifffile as (H, W) or (H, W, 3) float32, or None when
+    the page is not plain grayscale / 8-bit RGB (Pillow handles the rest).
+    """
+    with tifffile.TiffFile(file_path) as tif:
+        page = tif.pages[0]
+        photometric = page.photometric
+        if photometric not in (tifffile.PHOTOMETRIC.MINISBLACK, tifffile.PHOTOMETRIC.RGB):
+            return None
+        arr = page.asarray()
+
+    if photometric == tifffile.PHOTOMETRIC.RGB:
+        if arr.dtype != np.uint8 or arr.ndim != 3:
+            return None
+        if arr.shape[-1] not in (3, 4) and arr.shape[0] in (3, 4):
+            arr = np.moveaxis(arr, 0, -1)  # planar (S,H,W) -> (H,W,S)
+        return _u8_to_f32(np.ascontiguousarray(arr[..., :3]))
+
+    if arr.ndim != 2:
+        return None
+    return _u8_to_f32(arr)
+
+
+@_cache_by_file()
 def load_tiff(file_path):
     """Minimal load for TIFF (first page). Preserve RGB if present."""
+    if TIFFFILE_AVAILABLE:
+        try:
+            arr = _tifffile_first_page(file_path)
+            if arr is not None:
+                return arr
+        except Exception as e:
+            log.debug("tifffile read failed, using Pillow: %s", e)
+
     with Image.open(file_path) as img:
         if img.mode in ("RGB", "RGBA", "P"):
-            arr = img.convert("RGB")
-        else:
-            arr = img.convert("L")
-    return np.array(arr, dtype=np.float32)
+            return _u8_to_f32(_pil_to_rgb_u8(img))
+        return _u8_to_f32(_pil_to_gray_u8(img))
 
 
 # ---------------------------------------------------------
 # DICOM: series stacking with safe fallback
 # ---------------------------------------------------------
+_SERIES_HEADER_TAGS = [
+    "SeriesInstanceUID",
+    "ImagePositionPatient",
+    "InstanceNumber",
+    "SliceLocation",
+    "Rows",
+    "Columns",
+    "RescaleSlope",
+    "RescaleIntercept",
+    "PhotometricInterpretation",
+    "BitsStored",
+    "PixelRepresentation",
+]
+
+
+def _read_series_header_fields(path):
+    """
+    Header-only read reduced to what series stacking needs:
+    (SeriesInstanceUID, z_flag, z, InstanceNumber, SliceLocation,
+     slope, intercept, MONOCHROME1, BitsStored, PixelRepresentation).
+    Returns None for files that are not DICOM image slices; the Dataset
+    itself is not kept.
+    """
+    # Skip PNG/JPEG/TIFF/NIfTI neighbours without handing them to pydicom
+    sniffed = _sniff_file_type(path)
+    if sniffed is not None and sniffed != "DICOM":
+        return None
+    try:
+        ds_h = pydicom.dcmread(
+            path, stop_before_pixels=True, force=True, specific_tags=_SERIES_HEADER_TAGS
+        )
+    except Exception:
+        return None
+    # keep only things that *look* like image slices
+    if getattr(ds_h, "Rows", None) is None or getattr(ds_h, "Columns", None) is None:
+        return None
+    return (
+        (getattr(ds_h, "SeriesInstanceUID", None),)
+        + _series_sort_fields(ds_h)
+        + (
+            _safe_float(getattr(ds_h, "RescaleSlope", 1.0), 1.0),
+            _safe_float(getattr(ds_h, "RescaleIntercept", 0.0), 0.0),
+            _is_monochrome1(ds_h),
+            _safe_int(getattr(ds_h, "BitsStored", None), default=0),
+            _safe_int(getattr(ds_h, "PixelRepresentation", None), default=0),
+        )
+    )
+
+
+def _series_fits_int16(rows):
+    """
+    True if every slice's rescaled values are integers inside the int16 range
+    (typical CT: slope 1, intercept -1024), so the volume can be stored as
+    int16 HU instead of float32 without changing any value.
+    """
+    lo_i16, hi_i16 = np.iinfo(np.int16).min, np.iinfo(np.int16).max
+    for slope, intercept, mono1, bits, signed in rows:
+        if mono1 or bits <= 0 or bits > 16:
+            return False
+        if slope != round(slope) or intercept != round(intercept):
+            return False
+        if signed:
+            raw_lo, raw_hi = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+        else:
+            raw_lo, raw_hi = 0, (1 << bits) - 1
+        ends = (raw_lo * slope + intercept, raw_hi * slope + intercept)
+        if min(ends) < lo_i16 or max(ends) > hi_i16:
+            return False
+    return True
+
+
+def _read_dicom_slice_into(path, out):
+    """
+    Decode one series slice and write it, rescaled, into ``out`` (a 2D
+    view into the series volume). Returns False if the file is not
+    a 2D slice of the same shape.
+    """
+    try:
+        ds = pydicom.dcmread(path, force=True)
+        if not _dicom_has_pixels(ds):
+            return False
+        raw = _dicom_pixels(ds)
+
+        # Skip non-2D slices and slices that do not match the stack
+        if raw.ndim != 2 or raw.shape != out.shape:
+            return False
+
+        slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
+        intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
+        _rescale_to_float32(raw, slope, intercept, mono1=_is_monochrome1(ds), out=out)
+        return True
+    except Exception:
+        return False
+
+
+@_cache_by_file(include_dir=True)
 def load_dicom_series_from_file(file_path):
     """
     Load a DICOM series based on the selected file.
     If it cannot form a series, falls back to single-file.
 
     Returns:
-      volume_3d (H,W,Z) float32 in HU-like units if slope/intercept exist,
+      volume_3d (H,W,Z) in HU-like units if slope/intercept exist: int16 when
+        every slice rescales to integers within int16 range (typical CT),
+        float32 otherwise,
       meta_str,
       meta_dict
     """
@@ -364,7 +1240,7 @@ def load_dicom_series_from_file(file_path):
 
     # Read reference header
     try:
-        ref = pydicom.dcmread(file_path, stop_before_pixels=True, force=True)
+        ref = _dicom_header(file_path)
     except Exception as e:
         raise RuntimeError(f"Failed to read DICOM header: {e}")
 
@@ -377,22 +1253,17 @@ def load_dicom_series_from_file(file_path):
     # Multi-frame? load directly without scanning folder
     nframes = _safe_int(getattr(ref, "NumberOfFrames", None), default=1)
     if nframes and nframes > 1:
-        ds = pydicom.dcmread(file_path, force=True)
-        if not _dicom_has_pixels(ds):
+        try:
+            ds, raw = _read_dicom_with_pixels(file_path)
+        except RuntimeError:
             return _load_dicom_single_as_volume(file_path, note="DICOM (single file)")
-        arr = ds.pixel_array.astype(np.float32)
+        slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
+        intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
+        arr = _rescale_to_float32(raw, slope, intercept, mono1=_is_monochrome1(ds))
         if arr.ndim == 3:
             # (frames,H,W) -> (H,W,frames)
             arr = np.moveaxis(arr, 0, -1)
 
-        slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
-        intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
-        arr = arr * slope + intercept
-
-        pi = getattr(ds, "PhotometricInterpretation", "")
-        if isinstance(pi, str) and pi.strip().upper() == "MONOCHROME1":
-            arr = np.max(arr) - arr
-
         meta = _dicom_meta_from_ds(ds)
         meta["SeriesInstanceUID"] = str(series_uid)
         meta["NumberOfFrames"] = int(nframes)
@@ -406,73 +1277,69 @@ def load_dicom_series_from_file(file_path):
             f"Slope/Intercept: {meta.get('RescaleSlope')}, {meta.get('RescaleIntercept')}\n"
             "=============================\n"
         )
-        return arr.astype(np.float32), meta_str, meta
+        return arr.astype(np.float32, copy=False), meta_str, meta
 
-    # Collect slices in folder matching SeriesInstanceUID
-    candidates = []
+    # Collect slices in folder matching SeriesInstanceUID (header reads run in parallel)
+    paths = []
     for name in sorted(os.listdir(folder)):
         p = os.path.join(folder, name)
-        if not os.path.isfile(p):
-            continue
-        try:
-            ds_h = pydicom.dcmread(p, stop_before_pixels=True, force=True)
-        except Exception:
-            continue
-        if getattr(ds_h, "SeriesInstanceUID", None) != series_uid:
-            continue
-        # keep only things that *look* like image slices
-        if getattr(ds_h, "Rows", None) is None or getattr(ds_h, "Columns", None) is None:
-            continue
-        candidates.append((p, ds_h))
-
-    # If we cannot find a stack, fallback to single-file
-    if len(candidates) < 2:
-        return _load_dicom_single_as_volume(file_path, note="DICOM (single file)")
+        if os.path.isfile(p):
+            paths.append(p)
 
-    # Sort slices
-    candidates.sort(key=lambda item: _series_sort_key(item[1], os.path.basename(item[0])))
+    with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as ex:
+        fields = list(ex.map(_read_series_header_fields, paths))
 
-    slices = []
-    first_shape = None
-    first_ds_full = None
+    sel = [i for i, f in enumerate(fields) if f is not None and f[0] == series_uid]
 
-    for p, _ds_h in candidates:
-        try:
-            ds = pydicom.dcmread(p, force=True)
-            if not _dicom_has_pixels(ds):
-                continue
-            arr2d = ds.pixel_array.astype(np.float32)
+    # If we cannot find a stack, fallback to single-file
+    if len(sel) < 2:
+        return _load_dicom_single_as_volume(file_path, note="DICOM (single file)")
 
-            # Skip non-2D slices for now
-            if arr2d.ndim != 2:
-                continue
+    # Sort slices by (IPP z, InstanceNumber, SliceLocation, filename), slices
+    # without IPP last; one array per key, primary key last for np.lexsort
+    cand_paths = [paths[i] for i in sel]
+    z_flags = np.array([fields[i][1] for i in sel], dtype=np.int8)
+    zs = np.array([fields[i][2] for i in sel], dtype=np.float64)
+    insts = np.array([fields[i][3] for i in sel], dtype=np.int64)
+    sls = np.array([fields[i][4] for i in sel], dtype=np.float64)
+    names = np.array([os.path.basename(p) for p in cand_paths])
+    order = np.lexsort((names, sls, insts, zs, z_flags))
+    sorted_paths = [cand_paths[i] for i in order]
+
+    # Decode + rescale slices in parallel (pydicom I/O and pixel decoders release the GIL).
+    # The (H,W,Z) volume is allocated up front from the reference header and
+    # each worker rescales straight into its own slice, so there is no
+    # per-slice float32 temporary and no stacking copy.
+    rows = _safe_int(getattr(ref, "Rows", None), default=0)
+    cols = _safe_int(getattr(ref, "Columns", None), default=0)
+    if rows <= 0 or cols <= 0:
+        return _load_dicom_single_as_volume(file_path, note="DICOM (single file)")
 
-            if first_shape is None:
-                first_shape = arr2d.shape
-                first_ds_full = ds
-            elif arr2d.shape != first_shape:
-                # Keep stack consistent
-                continue
+    # Integer HU (most CT) is stored as int16: half the memory of float32
+    rescale = [fields[sel[i]][5:10] for i in order]
+    vol_dtype = np.int16 if _series_fits_int16(rescale) else np.float32
+    vol = np.empty((rows, cols, len(sorted_paths)), dtype=vol_dtype)
 
-            slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
-            intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
-            arr2d = arr2d * slope + intercept
+    def _decode(i):
+        return _read_dicom_slice_into(sorted_paths[i], vol[..., i])
 
-            pi = getattr(ds, "PhotometricInterpretation", "")
-            if isinstance(pi, str) and pi.strip().upper() == "MONOCHROME1":
-                arr2d = np.max(arr2d) - arr2d
+    with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as ex:
+        ok = list(ex.map(_decode, range(len(sorted_paths))))
 
-            slices.append(arr2d)
-        except Exception:
-            continue
+    keep = [i for i, good in enumerate(ok) if good]
 
     # If stacking failed, fallback
-    if len(slices) < 1:
+    if not keep:
         return _load_dicom_single_as_volume(file_path, note="DICOM (single file)")
 
-    vol = np.stack(slices, axis=-1).astype(np.float32)  # (H,W,Z)
+    if len(keep) < vol.shape[-1]:
+        vol = vol[..., keep]  # drop unreadable / mismatched slices
 
-    meta = _dicom_meta_from_ds(first_ds_full) if first_ds_full is not None else {}
+    try:
+        first_hdr = _dicom_header(sorted_paths[keep[0]])
+    except Exception:
+        first_hdr = None
+    meta = _dicom_meta_from_ds(first_hdr)
     meta["SeriesInstanceUID"] = str(series_uid)
     meta["NumSlices"] = int(vol.shape[-1])
 
@@ -521,29 +1388,21 @@ def _dicom_meta_from_ds(ds) -> dict:
 
 
 def _load_dicom_single_as_volume(file_path, note="DICOM (single file)"):
-    ds = pydicom.dcmread(file_path, force=True)
-    if not _dicom_has_pixels(ds):
-        raise RuntimeError("DICOM has no PixelData to display.")
-
-    arr = ds.pixel_array.astype(np.float32)
-    # If it is multi-frame but we arrived here, try to reshape anyway
-    if arr.ndim == 3:
-        # assume (frames,H,W) -> (H,W,frames)
-        arr = np.moveaxis(arr, 0, -1)
-        vol = arr.astype(np.float32)
-    elif arr.ndim == 2:
-        vol = arr[..., np.newaxis].astype(np.float32)
-    else:
+    ds, raw = _read_dicom_with_pixels(file_path)
+    if raw.ndim not in (2, 3):
         # Unsupported for now
-        raise RuntimeError(f"Unsupported DICOM pixel array shape: {arr.shape}")
+        raise RuntimeError(f"Unsupported DICOM pixel array shape: {raw.shape}")
 
     slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
     intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
-    vol = vol * slope + intercept
+    arr = _rescale_to_float32(raw, slope, intercept, mono1=_is_monochrome1(ds))
 
-    pi = getattr(ds, "PhotometricInterpretation", "")
-    if isinstance(pi, str) and pi.strip().upper() == "MONOCHROME1":
-        vol = np.max(vol) - vol
+    # If it is multi-frame but we arrived here, try to reshape anyway
+    if arr.ndim == 3:
+        # assume (frames,H,W) -> (H,W,frames)
+        vol = np.moveaxis(arr, 0, -1)
+    else:
+        vol = arr[..., np.newaxis]
 
     meta = _dicom_meta_from_ds(ds)
     meta["SeriesInstanceUID"] = getattr(ds, "SeriesInstanceUID", None)
@@ -558,7 +1417,24 @@ def _load_dicom_single_as_volume(file_path, note="DICOM (single file)"):
         f"Slope/Intercept: {meta.get('RescaleSlope')}, {meta.get('RescaleIntercept')}\n"
         "===============================\n"
     )
-    return vol.astype(np.float32), meta_str, meta
+    return vol.astype(np.float32, copy=False), meta_str, meta
+
+
+def load_dicom_middle_frame(file_path):
+    """
+    Decode only the middle frame of a multi-frame DICOM.
+    Returns a 2D float32 array (slope/intercept + MONOCHROME1 applied).
+    """
+    ds = pydicom.dcmread(file_path, force=True)
+    if not _dicom_has_pixels(ds):
+        raise RuntimeError("DICOM has no PixelData to display.")
+
+    nframes = _safe_int(getattr(ds, "NumberOfFrames", None), default=1)
+    raw = _dicom_pixels(ds, index=nframes // 2)
+
+    slope = _safe_float(getattr(ds, "RescaleSlope", 1.0), 1.0)
+    intercept = _safe_float(getattr(ds, "RescaleIntercept", 0.0), 0.0)
+    return _rescale_to_float32(raw, slope, intercept, mono1=_is_monochrome1(ds))
 
 
 # Backward-compatible: old API used in older viewer code
@@ -569,6 +1445,15 @@ def load_dicom(file_path):
       - (older code expected 0..255 sometimes)
     Prefer using load_dicom_series_from_file() in the new viewer.
     """
+    # Multi-frame: decode only the frame we return instead of the whole volume
+    try:
+        hdr = _dicom_header(file_path)
+        nframes = _safe_int(getattr(hdr, "NumberOfFrames", None), default=1)
+    except Exception:
+        nframes = 1
+    if nframes > 1:
+        return load_dicom_middle_frame(file_path)
+
     vol, _meta_str, _meta = load_dicom_series_from_file(file_path)
     # return middle slice as 2D if it is a volume
     if vol.ndim == 3:
@@ -1,32 +1,81 @@
 # image_processing.py
 
+import functools
+from collections import OrderedDict
+
 import numpy as np
 import cv2
 
 
-def apply_histogram_equalization(img_array: np.ndarray) -> np.ndarray:
+class PipelineBuffers:
+    """
+    Reusable output / scratch arrays for apply_all_processing, reallocated
+    only when the image shape or dtype changes. Keep one per displayed view;
+    an array returned by a call that used the buffers is overwritten by the
+    next such call, so consume (or copy) it before processing the next frame.
+    """
+
+    def __init__(self):
+        self._bufs = {}
+
+    def get(self, name: str, shape, dtype) -> np.ndarray:
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        buf = self._bufs.get(name)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._bufs[name] = buf
+        return buf
+
+
+_HIST16_DTYPES = (np.dtype(np.uint16), np.dtype(np.int16))
+
+
+def apply_histogram_equalization(img_array: np.ndarray, cache_key=None) -> np.ndarray:
     """
     Apply histogram equalization to a single-channel (grayscale) image.
     If a 3-channel image is passed, it is first converted to grayscale.
+    The equalization table (same as cv2.equalizeHist) is applied straight to
+    float32 in one cv2.LUT pass; with cache_key it is reused while the key
+    repeats (see apply_all_processing's hist_eq_key).
+    uint16 / int16 images (DICOM) are equalized from their full 16-bit
+    histogram instead of being wrapped to uint8 first.
     """
+    if img_array.ndim == 2 and img_array.dtype in _HIST16_DTYPES:
+        idx = _hist16_index(img_array)
+        return np.take(_equalize_hist_lut_cached(idx, cache_key), idx)
+
     if img_array.ndim == 3 and img_array.shape[2] == 3:
         # Convert color to grayscale first
         img_gray = cv2.cvtColor(img_array.astype(np.uint8), cv2.COLOR_BGR2GRAY)
     else:
-        img_gray = img_array.astype(np.uint8)
+        img_gray = img_array.astype(np.uint8, copy=False)
 
-    eq = cv2.equalizeHist(img_gray)
-    return eq.astype(np.float32)
+    return cv2.LUT(img_gray, _equalize_hist_lut_cached(img_gray, cache_key))
 
 
 def apply_colormap(img_array: np.ndarray, colormap: int = cv2.COLORMAP_JET) -> np.ndarray:
     """
     Apply an OpenCV colormap to a single-channel image.
-    Output is 3-channel uint8 (H, W, 3).
+    Output is 3-channel (H, W, 3) float32 with uint8 color values, looked up
+    in one gather from the cached 256-entry table for the colormap.
     """
-    img_u8 = np.clip(img_array, 0, 255).astype(np.uint8)
-    colored = cv2.applyColorMap(img_u8, colormap)
-    return colored.astype(np.float32)
+    if img_array.ndim == 3 and img_array.shape[2] == 1:
+        img_array = img_array[:, :, 0]
+    if img_array.dtype == np.uint8:
+        img_u8 = img_array
+    else:
+        img_u8 = np.empty(img_array.shape, dtype=np.uint8)
+        np.clip(img_array, 0, 255, out=img_u8, casting="unsafe")
+    return _colormap_table(int(colormap))[img_u8]
+
+
+@functools.lru_cache(maxsize=64)
+def _brightness_contrast_lut(brightness: float, contrast: float) -> np.ndarray:
+    """256-entry float32 table of v * contrast + brightness for uint8 inputs."""
+    lut = np.arange(256, dtype=np.float32) * np.float32(contrast) + np.float32(brightness)
+    lut.flags.writeable = False
+    return lut
 
 
 def adjust_brightness_contrast(
@@ -40,112 +89,233 @@ def adjust_brightness_contrast(
 
     brightness ∈ [-100..100], contrast ∈ [1..5] recommended.
     Works for 2D or 3D (color) arrays.
+    uint8 inputs go through a cached 256-entry table (cv2.LUT) instead of
+    per-pixel float math; the float32 result is identical.
+    Other inputs (including (Z, H, W) volumes) are cast and scaled in one
+    pass into a single new float32 buffer, then offset in place.
     """
-    float_img = img_array.astype(np.float32)
-    float_img = float_img * float(contrast) + float(brightness)
+    if img_array.dtype == np.uint8 and img_array.ndim in (2, 3):
+        return cv2.LUT(img_array, _brightness_contrast_lut(float(brightness), float(contrast)))
+
+    float_img = np.multiply(img_array, np.float32(contrast), dtype=np.float32)
+    float_img += np.float32(brightness)
     return float_img
 
 
+_GRAY_RAMP_U8 = np.arange(256, dtype=np.uint8).reshape(256, 1)
+
+
+def _equalize_hist_lut(img_u8: np.ndarray) -> np.ndarray:
+    """
+    The 256-entry mapping cv2.equalizeHist would apply to img_u8
+    (same CDF and rounding), as float32.
+    A uint16 image gets the same mapping over all 65536 levels (still onto
+    0..255), from a full-resolution histogram.
+    """
+    if img_u8.dtype == np.uint16:
+        hist = np.bincount(img_u8.ravel(), minlength=65536).astype(np.float64)
+    else:
+        hist = cv2.calcHist([img_u8], [0], None, [256], [0, 256]).ravel()
+    lut = np.zeros(hist.size, dtype=np.float32)
+    nz = np.flatnonzero(hist)
+    if nz.size == 0:
+        return lut
+    i = int(nz[0])
+    total = float(img_u8.size)
+    if hist[i] == total:
+        lut[:] = min(i, 255)
+        return lut
+    scale = 255.0 / (total - hist[i])
+    lut[i + 1:] = np.clip(np.rint(np.cumsum(hist[i + 1:], dtype=np.float64) * scale), 0, 255)
+    return lut
+
+
+def _hist16_index(img: np.ndarray) -> np.ndarray:
+    """uint16 / int16 image as uint16 histogram bins in value order (int16 shifted by 32768)."""
+    if img.dtype == np.int16:
+        return img.view(np.uint16) ^ np.uint16(0x8000)
+    return img
+
+
+# Hist-eq tables for recently displayed images, keyed by the caller's
+# hist_eq_key, so brightness/contrast/zoom changes skip the histogram pass
+_EQ_LUT_CACHE = OrderedDict()
+EQ_LUT_CACHE_MAX = 16
+
+
+def _equalize_hist_lut_cached(img_u8: np.ndarray, key=None) -> np.ndarray:
+    """_equalize_hist_lut, reused while the same key (and shape) comes back."""
+    if key is None:
+        return _equalize_hist_lut(img_u8)
+    key = (key, img_u8.shape, img_u8.dtype.str)
+    lut = _EQ_LUT_CACHE.get(key)
+    if lut is not None:
+        _EQ_LUT_CACHE.move_to_end(key)
+        return lut
+    lut = _equalize_hist_lut(img_u8)
+    lut.flags.writeable = False
+    _EQ_LUT_CACHE[key] = lut
+    while len(_EQ_LUT_CACHE) > EQ_LUT_CACHE_MAX:
+        _EQ_LUT_CACHE.popitem(last=False)
+    return lut
+
+
+@functools.lru_cache(maxsize=8)
+def _colormap_table(colormap: int) -> np.ndarray:
+    """(256, 3) float32 colors cv2.applyColorMap assigns to each gray level."""
+    table = cv2.applyColorMap(_GRAY_RAMP_U8, colormap).reshape(256, 3).astype(np.float32)
+    table.flags.writeable = False
+    return table
+
+
+def _apply_fused_lut(
+    img_u8: np.ndarray,
+    hist_eq: bool,
+    brightness_contrast: bool,
+    brightness: float,
+    contrast: float,
+    colormap: bool,
+    hist_eq_key=None,
+    buffers: PipelineBuffers | None = None,
+) -> np.ndarray:
+    """
+    Hist-eq -> brightness/contrast -> colormap on a 2D uint8 image, folded into
+    one 256-entry table and applied in a single gather. Same float32 result
+    as running the stages one after another.
+    """
+    if hist_eq:
+        lut = _equalize_hist_lut_cached(img_u8, hist_eq_key)
+    else:
+        lut = np.arange(256, dtype=np.float32)
+    if brightness_contrast:
+        lut = lut * np.float32(contrast) + np.float32(brightness)
+
+    if colormap:
+        idx = np.clip(lut, 0, 255).astype(np.uint8)
+        table = _colormap_table(cv2.COLORMAP_JET)[idx]
+        if buffers is None:
+            return table[img_u8]
+        dst = buffers.get("lut_rgb", img_u8.shape + (3,), np.float32)
+        return np.take(table, img_u8, axis=0, out=dst)
+    if buffers is None:
+        return cv2.LUT(img_u8, lut)
+    return cv2.LUT(img_u8, lut, dst=buffers.get("lut_gray", img_u8.shape, np.float32))
+
+
+def _zoom_pan_warp(w: int, h: int, zoom_factor: float, pan_x: float, pan_y: float):
+    """
+    Geometry shared by the image and mask zoom.
+    The view is a (w/zoom, h/zoom) window centred on the image centre
+    shifted by (pan_x, pan_y), clamped to stay inside the image.
+    Returns (x0, y0, x1, y1, M): the integer source box that the window
+    (plus one pixel for interpolation) needs, and the 2x3 affine matrix that
+    maps that box onto the (w, h) output with the same pixel-centre
+    convention as cv2.resize.
+    """
+    z = max(float(zoom_factor), 1.0)
+    half_w = w / (2.0 * z)
+    half_h = h / (2.0 * z)
+
+    cx = min(max(w / 2.0 + pan_x, half_w), w - half_w)
+    cy = min(max(h / 2.0 + pan_y, half_h), h - half_h)
+    left = cx - half_w
+    top = cy - half_h
+
+    x0 = max(0, int(np.floor(left)) - 1)
+    y0 = max(0, int(np.floor(top)) - 1)
+    x1 = min(w, int(np.ceil(left + 2.0 * half_w)) + 1)
+    y1 = min(h, int(np.ceil(top + 2.0 * half_h)) + 1)
+
+    M = np.array(
+        [
+            [z, 0.0, z * (0.5 - (left - x0)) - 0.5],
+            [0.0, z, z * (0.5 - (top - y0)) - 0.5],
+        ],
+        dtype=np.float64,
+    )
+    return x0, y0, x1, y1, M
+
+
 def apply_zoom_and_pan(
     img_array: np.ndarray,
     zoom_factor: float = 1.0,
     pan_x: float = 0.0,
     pan_y: float = 0.0,
+    buffers: PipelineBuffers | None = None,
 ) -> np.ndarray:
     """
     Zooms into the image around a center shifted by (pan_x, pan_y),
     then resizes back to the original resolution.
     - zoom_factor > 1.0: zoom in
-    - zoom_factor < 1.0: zoom out (clamped to 0.5..10.0 in the viewer)
+    - zoom_factor <= 1.0: the whole image, returned unchanged (the viewer allows 0.5..10.0)
     - pan_x, pan_y: shifts of the zoom center in pixel space.
 
     img_array is expected to be either (H, W) or (H, W, C).
+    Crop and resample are one cv2.warpAffine call. float32 input is warped
+    directly (values are not clipped); other dtypes go through uint8.
+    With buffers, the crop, warp and float32 result reuse those arrays.
     """
 
-    # If no zooming requested, return as-is
-    if zoom_factor is None or abs(zoom_factor - 1.0) < 1e-6:
+    # If no zooming requested, return as-is. The view window never extends
+    # past the image (see _zoom_pan_warp), so zoom <= 1 is the whole image
+    # unchanged too: skip the identity warp
+    if zoom_factor is None or zoom_factor < 1.0 + 1e-6:
         return img_array
 
-    if zoom_factor <= 0:
-        zoom_factor = 1.0
-
     # Handle both grayscale (H, W) and color (H, W, C)
-    if img_array.ndim == 2:
-        h, w = img_array.shape
-        channels = 1
-    elif img_array.ndim == 3:
-        h, w, channels = img_array.shape
-    else:
+    if img_array.ndim not in (2, 3):
         # Unsupported shape; just return original
         return img_array
+    h, w = img_array.shape[:2]
 
-    # Compute crop size
-    crop_w = int(round(w / zoom_factor))
-    crop_h = int(round(h / zoom_factor))
-
-    # Ensure valid crop sizes
-    crop_w = max(1, min(w, crop_w))
-    crop_h = max(1, min(h, crop_h))
-
-    # Compute zoom center in original image coords
-    # Center starts from image center, then shifted by pan_x / pan_y
-    cx = int(round(w / 2 + pan_x))
-    cy = int(round(h / 2 + pan_y))
-
-    # Clamp center so crop stays within bounds as much as possible
-    half_w = crop_w // 2
-    half_h = crop_h // 2
-
-    x1 = cx - half_w
-    y1 = cy - half_h
-    x2 = x1 + crop_w
-    y2 = y1 + crop_h
-
-    # Adjust if out of bounds
-    if x1 < 0:
-        x1 = 0
-        x2 = crop_w
-    if y1 < 0:
-        y1 = 0
-        y2 = crop_h
-    if x2 > w:
-        x2 = w
-        x1 = w - crop_w
-    if y2 > h:
-        y2 = h
-        y1 = h - crop_h
-
-    # Final safety clamp
-    x1 = int(max(0, min(x1, w - 1)))
-    y1 = int(max(0, min(y1, h - 1)))
-    x2 = int(max(x1 + 1, min(x2, w)))
-    y2 = int(max(y1 + 1, min(y2, h)))
-
-    # Crop
-    if img_array.ndim == 2:
-        cropped = img_array[y1:y2, x1:x2]
-    else:
-        cropped = img_array[y1:y2, x1:x2, :]
+    x0, y0, x1, y1, M = _zoom_pan_warp(w, h, zoom_factor, pan_x, pan_y)
+    src = img_array[y0:y1, x0:x1]
 
-    # Resize back to original size
-    if channels == 1:
-        cropped_u8 = np.clip(cropped, 0, 255).astype(np.uint8)
-        resized = cv2.resize(cropped_u8, (w, h), interpolation=cv2.INTER_LINEAR)
-        return resized.astype(np.float32)
+    # float32 images are resampled as they are (OpenCV's float warp): no clip
+    # or cast passes and no 8-bit rounding; viewers clip to [0, 255] on display
+    if src.dtype == np.float32 and (src.ndim == 2 or src.shape[2] <= 4):
+        dst = None if buffers is None else buffers.get("zoom_f32", img_array.shape, np.float32)
+        return cv2.warpAffine(
+            src, M, (w, h), dst=dst, flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+        )
+
+    # Clip + cast straight into one contiguous uint8 buffer (the box is a
+    # strided view), so the warp gets a dense 8-bit image
+    if src.dtype == np.uint8 and buffers is None:
+        src_u8 = np.ascontiguousarray(src)
     else:
-        # Color image
-        cropped_u8 = np.clip(cropped, 0, 255).astype(np.uint8)
-        resized = cv2.resize(cropped_u8, (w, h), interpolation=cv2.INTER_LINEAR)
-        return resized.astype(np.float32)
+        if buffers is None:
+            src_u8 = np.empty(src.shape, dtype=np.uint8)
+        else:
+            src_u8 = buffers.get("zoom_src", src.shape, np.uint8)
+        np.clip(src, 0, 255, out=src_u8, casting="unsafe")
+
+    if buffers is None:
+        warped = cv2.warpAffine(
+            src_u8, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE
+        )
+        return warped.astype(np.float32)
+
+    warped = cv2.warpAffine(
+        src_u8, M, (w, h),
+        dst=buffers.get("zoom_u8", img_array.shape, np.uint8),
+        flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE,
+    )
+    out = buffers.get("zoom_f32", img_array.shape, np.float32)
+    np.copyto(out, warped)
+    return out
+
+# Input dtypes cv2 arithmetic accepts
+_CV_ARITH_DTYPES = tuple(
+    np.dtype(t) for t in (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32, np.float64)
+)
+
 
 def apply_window_level(slice_raw: np.ndarray, center: float, width: float) -> np.ndarray:
     """
     Apply Window/Level mapping to a float32 slice in native units (e.g., HU).
     Returns float32 in [0, 255].
     """
-    x = slice_raw.astype(np.float32, copy=False)
-    x = np.nan_to_num(x, nan=0.0, posinf=0.0, neginf=0.0)
-
     w = float(width)
     if w <= 1e-6:
         w = 1.0
@@ -153,10 +323,33 @@ def apply_window_level(slice_raw: np.ndarray, center: float, width: float) -> np
 
     low = c - 0.5 - (w - 1.0) / 2.0
     high = c - 0.5 + (w - 1.0) / 2.0
-
-    y = (x - low) / (high - low)
-    y = np.clip(y, 0.0, 1.0) * 255.0
-    return y.astype(np.float32)
+    with np.errstate(divide="ignore"):
+        scale = np.float32(255.0) / np.float32(high - low)  # inf for width == 1
+
+    # Common case: x * scale - low * scale in one vectorized OpenCV pass
+    # straight to float32 (int16 HU slices included), then one in-place clip.
+    # Non-finite inputs/scales take the numpy path below.
+    if (
+        np.isfinite(scale)
+        and slice_raw.dtype in _CV_ARITH_DTYPES
+        and (slice_raw.ndim == 2 or (slice_raw.ndim == 3 and slice_raw.shape[2] <= 4))
+        and (slice_raw.dtype.kind != "f" or cv2.checkRange(slice_raw)[0])
+    ):
+        y = cv2.addWeighted(
+            slice_raw, float(scale), slice_raw, 0.0, -low * float(scale), dtype=cv2.CV_32F
+        )
+        np.clip(y, 0.0, 255.0, out=y)
+        return y
+
+    # (x - low) * scale into one float32 buffer, then clip in place.
+    # Non-finite inputs are treated as 0.0 (as nan_to_num(x) did).
+    y = np.subtract(slice_raw, np.float32(low), dtype=np.float32)
+    if slice_raw.dtype.kind == "f":
+        fill = 0.0 - low
+        np.nan_to_num(y, copy=False, nan=fill, posinf=fill, neginf=fill)
+    y *= scale
+    np.clip(y, 0.0, 255.0, out=y)
+    return y
 
 def apply_all_processing(
     img_array: np.ndarray,
@@ -169,6 +362,8 @@ def apply_all_processing(
     zoom_factor: float = 1.0,
     pan_x: float = 0.0,
     pan_y: float = 0.0,
+    hist_eq_key=None,
+    buffers: PipelineBuffers | None = None,
 ) -> np.ndarray:
     """
     Full processing pipeline:
@@ -177,29 +372,71 @@ def apply_all_processing(
       3. Colormap (optional, converts grayscale to color)
       4. Zoom & Pan (optional)
     Returns a float32 array; viewer will clip to [0, 255] and convert to uint8.
+    Nothing is copied up front: when no stage changes a float32 input, the
+    input array itself is returned, so callers must not modify the result
+    in place unless they own the input.
+    hist_eq_key: optional hashable that identifies the input image content
+    (e.g. file, slice and window/level); while it repeats, the equalization
+    table is reused instead of recomputing the histogram.
+    buffers: optional PipelineBuffers; intermediate and output arrays are
+    reused across calls (the result is overwritten by the next call).
     """
 
-    # Make working copy as float32
-    out = img_array.astype(np.float32)
+    # Steps 1-3 on a grayscale image that is (or, for hist-eq, gets cast to)
+    # uint8 are one 256-entry table: apply them in a single pass
+    gray = img_array
+    if gray.ndim == 3 and gray.shape[2] == 1 and hist_eq:
+        gray = gray[:, :, 0]
+    if hist_eq and gray.ndim == 2 and gray.dtype in _HIST16_DTYPES:
+        # 16-bit input: equalize from the full histogram rather than wrapping
+        # to uint8; the remaining stages run on the float32 result
+        out = apply_histogram_equalization(gray, hist_eq_key)
+        hist_eq = False
+    elif gray.ndim == 2 and (gray.dtype == np.uint8 or hist_eq) and (hist_eq or brightness_contrast or colormap):
+        if gray.dtype == np.uint8:
+            gray_u8 = gray
+        elif buffers is None:
+            gray_u8 = gray.astype(np.uint8)
+        else:
+            gray_u8 = buffers.get("gray_u8", gray.shape, np.uint8)
+            np.copyto(gray_u8, gray, casting="unsafe")
+        out = _apply_fused_lut(
+            gray_u8,
+            hist_eq,
+            brightness_contrast,
+            float(brightness),
+            float(contrast),
+            colormap,
+            hist_eq_key=hist_eq_key,
+            buffers=buffers,
+        )
+        hist_eq = brightness_contrast = colormap = False
+    else:
+        # float32 view of the input; stages that need to write allocate first
+        out = img_array.astype(np.float32, copy=False)
 
     # 1) Histogram Equalization (only meaningful for single-channel)
     if hist_eq:
         if out.ndim == 2:
-            out = apply_histogram_equalization(out)
+            out = apply_histogram_equalization(out, hist_eq_key)
         elif out.ndim == 3 and out.shape[2] == 1:
-            out = apply_histogram_equalization(out[:, :, 0])
+            out = apply_histogram_equalization(out[:, :, 0], hist_eq_key)
         else:
             # If already color, you might skip or convert to gray;
             # here we skip to avoid weird effects.
             pass
 
-    # 2) Brightness / Contrast
+    # 2) Brightness / Contrast (in place once out is our own buffer)
     if brightness_contrast:
-        out = adjust_brightness_contrast(
-            out,
-            brightness=float(brightness),
-            contrast=float(contrast),
-        )
+        if out is img_array or out.dtype != np.float32:
+            out = adjust_brightness_contrast(
+                out,
+                brightness=float(brightness),
+                contrast=float(contrast),
+            )
+        else:
+            out *= np.float32(contrast)
+            out += np.float32(brightness)
 
     # 3) Colormap (only if image is single-channel)
     if colormap:
@@ -214,9 +451,77 @@ def apply_all_processing(
             zoom_factor=float(zoom_factor),
             pan_x=float(pan_x),
             pan_y=float(pan_y),
+            buffers=buffers,
         )
 
-    return out.astype(np.float32)
+    return out.astype(np.float32, copy=False)
+
+# Mask dtypes cv2.warpAffine handles natively with INTER_NEAREST
+_WARP_NEAREST_DTYPES = tuple(np.dtype(t) for t in (np.uint8, np.uint16, np.int16, np.float32))
+
+
+class PipelineCache:
+    """
+    apply_all_processing for one view that keeps the last pre-zoom result
+    (hist-eq -> brightness/contrast -> colormap) per source_key, so pan/zoom
+    changes only redo the warp. source_key must identify the input content
+    (like hist_eq_key); without it every call runs the full pipeline.
+    Returned arrays are owned by the cache: consume (or copy) them before the
+    next call and do not modify them.
+    """
+
+    def __init__(self):
+        self._key = None
+        self._pre = None
+        self._buffers = PipelineBuffers()
+
+    def process(
+        self,
+        img_array: np.ndarray,
+        source_key=None,
+        hist_eq: bool = False,
+        brightness_contrast: bool = False,
+        brightness: float = 0.0,
+        contrast: float = 1.0,
+        colormap: bool = False,
+        zoom_enabled: bool = False,
+        zoom_factor: float = 1.0,
+        pan_x: float = 0.0,
+        pan_y: float = 0.0,
+    ) -> np.ndarray:
+        key = None
+        if source_key is not None:
+            key = (
+                source_key, img_array.shape, img_array.dtype.str,
+                bool(hist_eq), bool(brightness_contrast), float(brightness), float(contrast), bool(colormap),
+            )
+
+        if key is not None and key == self._key:
+            pre = self._pre
+        else:
+            # No buffers here: the pre-zoom result outlives this call
+            pre = apply_all_processing(
+                img_array,
+                hist_eq=hist_eq,
+                brightness_contrast=brightness_contrast,
+                brightness=brightness,
+                contrast=contrast,
+                colormap=colormap,
+                hist_eq_key=source_key,
+            )
+            self._key = key
+            self._pre = pre if key is not None else None
+
+        if zoom_enabled:
+            return apply_zoom_and_pan(
+                pre,
+                zoom_factor=float(zoom_factor),
+                pan_x=float(pan_x),
+                pan_y=float(pan_y),
+                buffers=self._buffers,
+            )
+        return pre
+
 
 def apply_zoom_and_pan_mask(
     mask_array: np.ndarray,
@@ -227,17 +532,16 @@ def apply_zoom_and_pan_mask(
     """
     Same geometry as apply_zoom_and_pan, but uses nearest-neighbor to preserve labels.
     mask_array must be 2D (H, W).
-    Returns float32 or uint8 mask resized back to original (H, W).
+    Returns the mask resized back to original (H, W): uint8 / uint16 / int16 /
+    float32 masks keep their dtype (no truncation of labels > 255), bool
+    masks come back as uint8 0/1, anything else is cast to uint8.
     """
     if mask_array is None:
         return None
 
-    if zoom_factor is None or abs(zoom_factor - 1.0) < 1e-6:
+    if zoom_factor is None or zoom_factor < 1.0 + 1e-6:
         return mask_array
 
-    if zoom_factor <= 0:
-        zoom_factor = 1.0
-
     m = mask_array
     if m.ndim != 2:
         m = np.squeeze(m)
@@ -246,42 +550,14 @@ def apply_zoom_and_pan_mask(
 
     h, w = m.shape
 
-    crop_w = int(round(w / zoom_factor))
-    crop_h = int(round(h / zoom_factor))
-    crop_w = max(1, min(w, crop_w))
-    crop_h = max(1, min(h, crop_h))
-
-    cx = int(round(w / 2 + pan_x))
-    cy = int(round(h / 2 + pan_y))
-
-    half_w = crop_w // 2
-    half_h = crop_h // 2
-
-    x1 = cx - half_w
-    y1 = cy - half_h
-    x2 = x1 + crop_w
-    y2 = y1 + crop_h
-
-    if x1 < 0:
-        x1 = 0
-        x2 = crop_w
-    if y1 < 0:
-        y1 = 0
-        y2 = crop_h
-    if x2 > w:
-        x2 = w
-        x1 = w - crop_w
-    if y2 > h:
-        y2 = h
-        y1 = h - crop_h
-
-    x1 = int(max(0, min(x1, w - 1)))
-    y1 = int(max(0, min(y1, h - 1)))
-    x2 = int(max(x1 + 1, min(x2, w)))
-    y2 = int(max(y1 + 1, min(y2, h)))
-
-    cropped = m[y1:y2, x1:x2].astype(np.uint8)
+    x0, y0, x1, y1, M = _zoom_pan_warp(w, h, zoom_factor, pan_x, pan_y)
+    if m.dtype == np.bool_:
+        m = m.view(np.uint8)
+    elif m.dtype not in _WARP_NEAREST_DTYPES:
+        m = m.astype(np.uint8)
+    src = np.ascontiguousarray(m[y0:y1, x0:x1])
 
     # Nearest-neighbor is critical for masks
-    resized = cv2.resize(cropped, (w, h), interpolation=cv2.INTER_NEAREST)
-    return resized
+    return cv2.warpAffine(
+        src, M, (w, h), flags=cv2.INTER_NEAREST, borderMode=cv2.BORDER_REPLICATE
+    )
@@ -1,6 +1,9 @@
 # main.py
 
 import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import json
 import tkinter as tk
@@ -14,6 +17,24 @@ import viewer_multi_slicetime
 APP_NAME = "SMIV"
 MAX_RECENT = 10
 
+SCAN_FILETYPES = (
+    ("All files (including no extension)", "*"),
+    ("DICOM Files", "*.dcm"),
+    ("NIfTI Files (.nii/.nii.gz)", "*.nii *.nii.gz"),
+    ("PNG/JPG Images", "*.png *.jpg *.jpeg"),
+    ("TIFF/WSI Images", "*.tif *.tiff *.svs *.ndpi *.scn *.mrxs"),
+)
+
+# Sidecar / document files that sit next to scans and are never images; the
+# folder scan skips them without opening them. (No whitelist: DICOM files are
+# often extensionless or named like UIDs, e.g. "1.2.840.113619.2.55.3".)
+_SKIP_SCAN_EXTS = frozenset({
+    ".txt", ".csv", ".tsv", ".xml", ".json", ".log", ".md", ".html", ".htm",
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ini", ".cfg", ".yaml", ".yml",
+    ".py", ".sh", ".bat", ".exe", ".dll", ".zip", ".7z", ".rar", ".db",
+    ".bak", ".tmp", ".lnk", ".url",
+})
+
 
 def _config_dir() -> Path:
     d = Path.home() / ".smiv"
@@ -25,12 +46,20 @@ def _recent_file_path() -> Path:
     return _config_dir() / "recent_files.json"
 
 
+# Text of recent_files.json as last read or written, so unchanged lists skip the write
+_LAST_RECENT_TEXT = None
+
+
 def load_recent_files() -> list:
+    global _LAST_RECENT_TEXT
     p = _recent_file_path()
     if not p.exists():
+        _LAST_RECENT_TEXT = None
         return []
     try:
-        data = json.loads(p.read_text(encoding="utf-8"))
+        text = p.read_text(encoding="utf-8")
+        _LAST_RECENT_TEXT = text
+        data = json.loads(text)
         if isinstance(data, list):
             out = []
             for x in data:
@@ -43,15 +72,25 @@ def load_recent_files() -> list:
 
 
 def save_recent_files(paths: list) -> None:
+    global _LAST_RECENT_TEXT
     p = _recent_file_path()
     paths = [x for x in paths if isinstance(x, str) and x.strip()]
-    p.write_text(json.dumps(paths[:MAX_RECENT], indent=2), encoding="utf-8")
+    text = json.dumps(paths[:MAX_RECENT], indent=2)
+    if text == _LAST_RECENT_TEXT and p.exists():
+        return
+
+    # Write a sibling temp file and swap it in, so a crash never leaves half a file
+    tmp = p.with_name(p.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, p)
+    _LAST_RECENT_TEXT = text
 
 
 def add_recent_file(path: str) -> None:
     path = os.path.abspath(path)
     rec = load_recent_files()
-    rec = [p for p in rec if os.path.abspath(p) != path]
+    # Stored entries are absolute already (written by this function)
+    rec = [p for p in rec if p != path]
     rec.insert(0, path)
     # Keep only existing paths
     rec = [p for p in rec if os.path.exists(p)]
@@ -62,43 +101,110 @@ def clear_recent_files() -> None:
     save_recent_files([])
 
 
+# Recent scan results, keyed by the folder and each candidate's
+# (name, mtime_ns, size): adding, removing, renaming or rewriting a file in
+# place (e.g. a re-exported DICOM with a new SeriesInstanceUID) invalidates
+# the entry
+_SCAN_CACHE = OrderedDict()
+SCAN_CACHE_MAX = 8
+
+
 def scan_directory_for_images(dir_path: str) -> list:
     """
-    Scans a directory and returns recognized image paths.
+    Scans a directory and returns recognized (absolute) image paths.
 
     IMPORTANT:
       - DICOM is grouped as ONE entry per SeriesInstanceUID (so folders with 300 slices won't flood the slider).
       - Non-DICOM files are added normally.
+      - Results are reused while no candidate file is added, removed or rewritten.
+    """
+    return scan_directory_with_series(dir_path)[0]
+
+
+def scan_directory_with_series(dir_path: str):
+    """
+    scan_directory_for_images() plus {SeriesInstanceUID: index} of each DICOM
+    series' representative path in the returned list.
     """
     if not dir_path or not os.path.isdir(dir_path):
-        return []
+        return [], {}
 
-    all_files = sorted(os.listdir(dir_path))
-    recognized = []
+    # Absolute once here, so every returned path is absolute
+    dir_path = os.path.abspath(dir_path)
+    try:
+        entries = _scan_entries(dir_path)
+    except OSError:
+        return [], {}
+
+    key = (dir_path, tuple((e.name, st.st_mtime_ns, st.st_size) for e, st in entries))
+    if key in _SCAN_CACHE:
+        _SCAN_CACHE.move_to_end(key)
+        recognized, uid_to_index = _SCAN_CACHE[key]
+        # Callers reorder the list, so hand out copies
+        return list(recognized), dict(uid_to_index)
+
+    recognized, uid_to_index = _scan_directory_uncached([e.path for e, _st in entries])
+
+    _SCAN_CACHE[key] = (list(recognized), dict(uid_to_index))
+    while len(_SCAN_CACHE) > SCAN_CACHE_MAX:
+        _SCAN_CACHE.popitem(last=False)
+    return recognized, uid_to_index
+
+
+def _scan_entries(dir_path: str) -> list:
+    """
+    (DirEntry, stat) of the scan candidates in name order. scandir's entries
+    carry the file type, so is_file() needs no stat() (symlinks are followed
+    like os.path.isfile); skipped extensions are never stat'ed.
+    """
+    out = []
+    with os.scandir(dir_path) as it:
+        for e in it:
+            if os.path.splitext(e.name)[1].lower() in _SKIP_SCAN_EXTS or not e.is_file():
+                continue
+            try:
+                out.append((e, e.stat()))
+            except OSError:
+                continue
+    out.sort(key=lambda item: item[0].name)
+    return out
 
-    seen_dicom_series = set()
 
-    for f in all_files:
-        full_p = os.path.join(dir_path, f)
-        if not os.path.isfile(full_p):
-            continue
+def _scan_one(full_p: str):
+    """(file_type, SeriesInstanceUID or None) for one file; never raises."""
+    try:
+        file_type, _ = image_loader.detect_file_type_and_metadata(full_p)
+    except Exception:
+        return None, None
 
+    uid = None
+    if file_type == "DICOM":
         try:
-            file_type, _ = image_loader.detect_file_type_and_metadata(full_p)
+            uid = image_loader.get_dicom_series_uid(full_p)
         except Exception:
-            file_type = None
+            uid = None
+    return file_type, uid
+
+
+def _scan_directory_uncached(candidates: list):
+    # Header reads are I/O bound: run them on a pool, then group in name order
+    if len(candidates) > 1:
+        with ThreadPoolExecutor(max_workers=image_loader.MAX_IO_WORKERS) as ex:
+            results = list(ex.map(_scan_one, candidates))
+    else:
+        results = [_scan_one(p) for p in candidates]
+
+    recognized = []
 
+    uid_to_index = {}
+
+    for full_p, (file_type, uid) in zip(candidates, results):
         if file_type == "DICOM":
             # Group by SeriesInstanceUID
-            try:
-                uid = image_loader.get_dicom_series_uid(full_p)
-            except Exception:
-                uid = None
-
             if uid:
-                if uid in seen_dicom_series:
+                if uid in uid_to_index:
                     continue
-                seen_dicom_series.add(uid)
+                uid_to_index[uid] = len(recognized)
                 recognized.append(full_p)
             else:
                 # If UID missing, keep it as a single item
@@ -107,13 +213,16 @@ def scan_directory_for_images(dir_path: str) -> list:
         elif file_type in ["NIfTI", "JPEG/PNG", "TIFF", "WHOLESLIDE"]:
             recognized.append(full_p)
 
-    return recognized
+    return recognized, uid_to_index
 
 
-def _move_selected_to_front(recognized_paths: list, selected_path: str) -> list:
+def _move_selected_to_front(recognized_paths: list, selected_path: str, uid_to_index: dict | None = None) -> list:
     """
     Ensures the selected item becomes the first item shown in the viewer.
     Special handling for DICOM: move the representative path of the selected series.
+    uid_to_index (from scan_directory_with_series) finds that path without
+    reading every candidate's UID. recognized_paths must be absolute, as the
+    scan returns them.
     """
     if not recognized_paths:
         return recognized_paths
@@ -134,14 +243,20 @@ def _move_selected_to_front(recognized_paths: list, selected_path: str) -> list:
 
         if selected_uid:
             rep_idx = None
-            for i, p in enumerate(recognized_paths):
-                try:
-                    uid_i = image_loader.get_dicom_series_uid(p)
-                except Exception:
-                    uid_i = None
-                if uid_i == selected_uid:
-                    rep_idx = i
-                    break
+            if uid_to_index is not None:
+                rep_idx = uid_to_index.get(selected_uid)
+                if rep_idx is not None and rep_idx >= len(recognized_paths):
+                    rep_idx = None
+            if rep_idx is None:
+                # Fallback: look the series up path by path
+                for i, p in enumerate(recognized_paths):
+                    try:
+                        uid_i = image_loader.get_dicom_series_uid(p)
+                    except Exception:
+                        uid_i = None
+                    if uid_i == selected_uid:
+                        rep_idx = i
+                        break
 
             if rep_idx is not None:
                 rep = recognized_paths.pop(rep_idx)
@@ -150,12 +265,12 @@ def _move_selected_to_front(recognized_paths: list, selected_path: str) -> list:
 
         # Fallback: if no UID match found, just force selected_path to front
         # (may duplicate, but better than opening a different series)
-        recognized_paths = [p for p in recognized_paths if os.path.abspath(p) != selected_path]
+        recognized_paths = [p for p in recognized_paths if p != selected_path]
         recognized_paths.insert(0, selected_path)
         return recognized_paths
 
     # Non-DICOM: move the exact file to front if present
-    recognized_paths = [p for p in recognized_paths if os.path.abspath(p) != selected_path]
+    recognized_paths = [p for p in recognized_paths if p != selected_path]
     recognized_paths.insert(0, selected_path)
     return recognized_paths
 
@@ -167,12 +282,12 @@ def open_viewer_with_selected_file(file_path: str, modality: str = "AUTO"):
     add_recent_file(file_path)
 
     dir_path = os.path.dirname(file_path)
-    recognized_paths = scan_directory_for_images(dir_path)
+    recognized_paths, uid_to_index = scan_directory_with_series(dir_path)
     if not recognized_paths:
         messagebox.showwarning(APP_NAME, "No supported image files were found in the selected file's folder.")
         return
 
-    recognized_paths = _move_selected_to_front(recognized_paths, file_path)
+    recognized_paths = _move_selected_to_front(recognized_paths, file_path, uid_to_index)
 
     viewer_multi_slicetime.create_viewer(recognized_paths, modality)
 
@@ -191,6 +306,10 @@ def open_viewer_with_folder(dir_path: str, modality: str = "AUTO"):
     viewer_multi_slicetime.create_viewer(recognized_paths, modality)
 
 
+# A {braced path} (may contain spaces; an unclosed brace runs to the end) or a bare token
+_DND_TOKEN_RE = re.compile(r"\{([^}]*)(?:\}|$)|([^\s{}]+)")
+
+
 def parse_dnd_files(data: str) -> list:
     """
     Parse TkDND file list. On Windows/macOS it may wrap paths with braces.
@@ -198,37 +317,12 @@ def parse_dnd_files(data: str) -> list:
     if not data:
         return []
 
-    data = data.strip()
     out = []
-    buf = ""
-    in_brace = False
-
-    for ch in data:
-        if ch == "{":
-            in_brace = True
-            buf = ""
-        elif ch == "}":
-            in_brace = False
-            if buf.strip():
-                out.append(buf.strip())
-            buf = ""
-        elif ch.isspace() and not in_brace:
-            if buf.strip():
-                out.append(buf.strip())
-            buf = ""
-        else:
-            buf += ch
-
-    if buf.strip():
-        out.append(buf.strip())
-
-    # Normalize
-    out2 = []
-    for p in out:
-        p = p.strip().strip('"')
+    for braced, bare in _DND_TOKEN_RE.findall(data):
+        p = (braced or bare).strip().strip('"')
         if p:
-            out2.append(p)
-    return out2
+            out.append(p)
+    return out
 
 
 def main():
@@ -269,13 +363,7 @@ def main():
         file_path = filedialog.askopenfilename(
             title="Select a file",
             initialdir=".",
-            filetypes=[
-                ("All files (including no extension)", "*"),
-                ("DICOM Files", "*.dcm"),
-                ("NIfTI Files (.nii/.nii.gz)", "*.nii *.nii.gz"),
-                ("PNG/JPG Images", "*.png *.jpg *.jpeg"),
-                ("TIFF/WSI Images", "*.tif *.tiff *.svs *.ndpi *.scn *.mrxs"),
-            ],
+            filetypes=SCAN_FILETYPES,
         )
         if not file_path:
             return
@@ -1,6 +1,7 @@
 # overlay_utils.py
 
 import os
+from collections import OrderedDict
 import numpy as np
 import nibabel as nib
 from PIL import Image
@@ -10,6 +11,40 @@ import json
 
 SUPPORTED_MASK_EXTS = {".nii", ".gz", ".nii.gz", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".npy"}
 
+_LABEL_NAMES_CACHE = OrderedDict()
+LABEL_NAMES_CACHE_MAX = 64  # parsed sidecar JSONs, keyed by (path, mtime_ns, size)
+_LABEL_CMAP_CACHE = OrderedDict()
+LABEL_CMAP_CACHE_MAX = 16  # label colormaps, keyed by the caller's cache_key
+
+
+def _cache_put(cache: OrderedDict, key, value, max_items: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_items:
+        cache.popitem(last=False)
+
+
+def _read_label_names_json(js: str) -> dict | None:
+    """Parse one sidecar JSON into dict[int, str]; None if it is not a label dict."""
+    with open(js, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if isinstance(data, dict) and "labels" in data and isinstance(data["labels"], dict):
+        data = data["labels"]
+
+    if not isinstance(data, dict):
+        return None
+
+    out = {}
+    for k, v in data.items():
+        try:
+            kk = int(k)
+        except Exception:
+            continue
+        if isinstance(v, str) and v.strip():
+            out[kk] = v.strip()
+    return out
+
 
 def load_label_names_for_mask(mask_path: str):
     """
@@ -45,29 +80,26 @@ def load_label_names_for_mask(mask_path: str):
     candidates.append(stem + ".json")
 
     for js in candidates:
-        if not os.path.exists(js):
-            continue
         try:
-            with open(js, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            if isinstance(data, dict) and "labels" in data and isinstance(data["labels"], dict):
-                data = data["labels"]
-
-            if not isinstance(data, dict):
-                continue
-
-            out = {}
-            for k, v in data.items():
-                try:
-                    kk = int(k)
-                except Exception:
-                    continue
-                if isinstance(v, str) and v.strip():
-                    out[kk] = v.strip()
-            return out
-        except Exception:
+            st = os.stat(js)
+        except OSError:
+            continue
+
+        # Parsed sidecars are cached until the JSON file changes
+        key = (js, st.st_mtime_ns, st.st_size)
+        if key in _LABEL_NAMES_CACHE:
+            _LABEL_NAMES_CACHE.move_to_end(key)
+            out = _LABEL_NAMES_CACHE[key]
+        else:
+            try:
+                out = _read_label_names_json(js)
+            except Exception:
+                out = None
+            _cache_put(_LABEL_NAMES_CACHE, key, out, LABEL_NAMES_CACHE_MAX)
+
+        if out is None:
             continue
+        return dict(out)
 
     return {}
 
@@ -78,10 +110,24 @@ def _lower_ext(path: str) -> str:
     return os.path.splitext(p)[1]
 
 
+def _mask_voxels(dataobj) -> np.ndarray:
+    """
+    NIfTI mask voxels keeping the on-disk dtype (label masks are usually
+    uint8/int16) instead of get_fdata()'s float64; only header-scaled data is
+    read as float32.
+    """
+    if nib.is_proxy(dataobj) and (
+        float(getattr(dataobj, "slope", 1.0)) != 1.0
+        or float(getattr(dataobj, "inter", 0.0)) != 0.0
+    ):
+        return np.asarray(dataobj, dtype=np.float32)
+    return np.asarray(dataobj)
+
+
 def load_mask(mask_path: str) -> np.ndarray:
     """
     Load a segmentation mask from:
-      - NIfTI (.nii, .nii.gz): returns float array
+      - NIfTI (.nii, .nii.gz): returns the on-disk dtype (float32 if scaled)
       - PNG/JPG/TIFF: returns uint8 2D array (grayscale)
       - NPY: returns numpy array as-is
 
@@ -91,8 +137,7 @@ def load_mask(mask_path: str) -> np.ndarray:
     ext = _lower_ext(mask_path)
 
     if ext in [".nii", ".nii.gz"]:
-        m = nib.load(mask_path).get_fdata()
-        return np.asarray(m)
+        return _mask_voxels(nib.load(mask_path).dataobj)
 
     if ext == ".npy":
         m = np.load(mask_path)
@@ -117,7 +162,8 @@ def get_mask_slice(mask_vol: np.ndarray, z_index: int = 0, t_index: int = 0) ->
     If mask is smaller than requested indices, indices are clamped.
 
     Returns:
-      2D mask array (H, W)
+      2D C-contiguous mask array (H, W); (H, W, Z) slices are strided, so they
+      are copied once here rather than inside every cv2 call downstream
     """
     if mask_vol is None:
         return None
@@ -125,21 +171,21 @@ def get_mask_slice(mask_vol: np.ndarray, z_index: int = 0, t_index: int = 0) ->
     m = np.asarray(mask_vol)
 
     if m.ndim == 2:
-        return m
+        return np.ascontiguousarray(m)
 
     if m.ndim == 3:
         z = int(np.clip(z_index, 0, m.shape[2] - 1))
-        return m[..., z]
+        return np.ascontiguousarray(m[..., z])
 
     if m.ndim == 4:
         z = int(np.clip(z_index, 0, m.shape[2] - 1))
         t = int(np.clip(t_index, 0, m.shape[3] - 1))
-        return m[..., z, t]
+        return np.ascontiguousarray(m[..., z, t])
 
     # Unknown shape; try to squeeze down
     m2 = np.squeeze(m)
     if m2.ndim == 2:
-        return m2
+        return np.ascontiguousarray(m2)
     raise ValueError(f"Unsupported mask shape: {m.shape}")
 
 
@@ -153,40 +199,59 @@ def to_binary_mask(mask2d: np.ndarray, threshold: float = 0.0) -> np.ndarray:
 
     m = np.asarray(mask2d)
 
-    # Handle NaNs
-    m = np.nan_to_num(m)
+    # The comparison already yields a fresh 0/1 byte array; reinterpret it
+    bin_m = np.greater(m, threshold)
+
+    # Handle NaNs (as 0) without a nan_to_num copy; integer masks have none
+    if m.dtype.kind in "fc" and threshold < 0:
+        bin_m |= np.isnan(m)
 
-    # If mask is already uint8, treat >0 as foreground
-    bin_m = (m > threshold).astype(np.uint8)
-    return bin_m
+    return bin_m.view(np.uint8)
 
 
 def resize_mask_nearest(mask2d: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
     """
     Resize mask using nearest neighbor (critical for segmentation masks).
-    Returns uint8 0/1 mask.
+    Returns a uint8 mask (uint16 label masks keep their dtype).
     """
     if mask2d is None:
         return None
 
-    m = np.asarray(mask2d).astype(np.uint8)
-    resized = cv2.resize(m, (int(target_w), int(target_h)), interpolation=cv2.INTER_NEAREST)
-    return resized.astype(np.uint8)
-
-
-def apply_overlay_to_pil(
-    base_pil: Image.Image,
+    m = np.asarray(mask2d)
+    if m.dtype == np.bool_:
+        m = m.view(np.uint8)
+    elif m.dtype != np.uint16:
+        m = m.astype(np.uint8, copy=False)
+    return cv2.resize(m, (int(target_w), int(target_h)), interpolation=cv2.INTER_NEAREST)
+
+
+def _as_rgb_u8(base_arr: np.ndarray) -> np.ndarray:
+    """(H, W) or (H, W, 3) image as (H, W, 3) uint8; RGB uint8 input is returned as-is."""
+    a = np.asarray(base_arr)
+    if a.dtype != np.uint8:
+        a = np.clip(a, 0, 255).astype(np.uint8)
+    if a.ndim == 2:
+        return cv2.cvtColor(a, cv2.COLOR_GRAY2RGB)
+    if a.ndim == 3 and a.shape[2] == 3:
+        return a
+    if a.ndim == 3 and a.shape[2] == 4:
+        return np.ascontiguousarray(a[:, :, :3])
+    raise ValueError(f"Unsupported image shape: {a.shape}")
+
+
+def apply_overlay_to_array(
+    base_arr: np.ndarray,
     mask2d_binary: np.ndarray,
     alpha: float = 0.35,
     color_rgb=(255, 0, 0),
-) -> Image.Image:
+) -> np.ndarray:
     """
-    Alpha blend a solid color overlay on top of base_pil where mask == 1.
+    Alpha blend a solid color overlay on top of base_arr where mask == 1.
 
-    base_pil:
-      - PIL.Image, mode "L" or "RGB"
+    base_arr:
+      - uint8 array, (H, W) grayscale or (H, W, 3) RGB
     mask2d_binary:
-      - 2D uint8 array (0/1) same width/height as base_pil
+      - 2D uint8 array (0/1) same width/height as base_arr
 
     alpha:
       - 0.0..1.0
@@ -195,21 +260,13 @@ def apply_overlay_to_pil(
       - overlay color tuple
 
     Returns:
-      PIL.Image in RGB mode
+      (H, W, 3) uint8 array; an RGB base_arr is returned as-is when there
+      is nothing to draw
     """
-    if base_pil is None or mask2d_binary is None:
-        return base_pil
-
     alpha = float(alpha)
     alpha = max(0.0, min(1.0, alpha))
 
-    # Ensure RGB output
-    if base_pil.mode != "RGB":
-        base_rgb = base_pil.convert("RGB")
-    else:
-        base_rgb = base_pil
-
-    base_arr = np.array(base_rgb, dtype=np.float32)  # (H, W, 3)
+    base_arr = _as_rgb_u8(base_arr)
     mask = (mask2d_binary > 0)
 
     if mask.ndim != 2:
@@ -220,68 +277,243 @@ def apply_overlay_to_pil(
             f"Mask size {mask.shape[::-1]} does not match image size {(base_arr.shape[1], base_arr.shape[0])}"
         )
 
-    overlay = np.zeros_like(base_arr)
-    overlay[:, :, 0] = float(color_rgb[0])
-    overlay[:, :, 1] = float(color_rgb[1])
-    overlay[:, :, 2] = float(color_rgb[2])
+    if alpha == 0.0:
+        return base_arr
 
-    # Blend only where mask is True
-    base_arr[mask] = (1.0 - alpha) * base_arr[mask] + alpha * overlay[mask]
+    # Bounding box of the mask; nothing to blend if it is empty
+    x, y, bw, bh = cv2.boundingRect(mask.view(np.uint8))
+    if bw == 0 or bh == 0:
+        return base_arr
+    roi = (slice(y, y + bh), slice(x, x + bw))
 
-    out = np.clip(base_arr, 0, 255).astype(np.uint8)
-    return Image.fromarray(out, mode="RGB")
+    # Blend the box in uint8 once, then keep it only where mask is True
+    out = base_arr.copy()
+    sub = out[roi]  # view into out
+    overlay = np.empty_like(sub)
+    overlay[:] = np.clip(np.rint(np.asarray(color_rgb, dtype=np.float64)[:3]), 0, 255)
+    blended = cv2.addWeighted(sub, 1.0 - alpha, overlay, alpha, 0.0)
 
-def apply_multiclass_overlay_to_pil(
+    np.copyto(sub, blended, where=mask[roi][:, :, None])
+    return out
+
+
+def apply_overlay_to_pil(
     base_pil: Image.Image,
-    mask2d: np.ndarray,
-    label_colors: dict,
+    mask2d_binary: np.ndarray,
     alpha: float = 0.35,
-    outline: bool = False,
-    label_visible: dict | None = None,
-):
+    color_rgb=(255, 0, 0),
+) -> Image.Image:
     """
-    Apply multi-class overlay. Safe fallback if only label=1 exists.
+    PIL wrapper around apply_overlay_to_array.
+
+    Returns:
+      PIL.Image in RGB mode
     """
-    if base_pil.mode != "RGB":
+    if base_pil is None or mask2d_binary is None:
+        return base_pil
+
+    if base_pil.mode not in ("L", "RGB"):
         base_pil = base_pil.convert("RGB")
 
-    base = np.array(base_pil, dtype=np.float32)
-    mask2d = np.asarray(mask2d)
-    label_visible = label_visible or {}
+    arr = np.asarray(base_pil)
+    out = apply_overlay_to_array(arr, mask2d_binary, alpha, color_rgb)
+    if out is arr:
+        return base_pil
+    return Image.fromarray(out, mode="RGB")
+
+
+# Label value ranges up to this size are mapped to palette rows through a
+# direct lookup table; sparser label ids (e.g. 2**31-1) use a sorted search
+_DENSE_LABEL_SPAN = 1 << 16
 
+
+def _label_lut(label_colors: dict, label_visible: dict):
+    """
+    Palette for the visible non-zero labels (negative ones included).
+    Returns (order, labels, colors): the labels in label_colors order, the
+    same labels sorted as int64, and (len(labels)+1, 3) uint8 colors where
+    row i belongs to labels[i] and the last row is the "not drawn" sentinel.
+    """
+    order = []
+    label_rgb = {}
     for lbl, color in label_colors.items():
         lbl_i = int(lbl)
-
         if lbl_i == 0:
             continue
-
         # If label is explicitly set to False, skip rendering it
         if lbl_i in label_visible and not bool(label_visible[lbl_i]):
             continue
+        if lbl_i not in label_rgb:
+            order.append(lbl_i)
+        label_rgb[lbl_i] = color
+
+    labels = np.array(sorted(label_rgb), dtype=np.int64)
+    colors = np.zeros((labels.size + 1, 3), dtype=np.uint8)
+    for row, lbl_i in enumerate(labels.tolist()):
+        colors[row] = np.clip(np.rint(np.asarray(label_rgb[lbl_i], dtype=np.float64)[:3]), 0, 255)
+    return order, labels, colors
 
-        region = (mask2d == lbl_i)
-        if not np.any(region):
+
+def _label_rows(mask2d: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Palette row of every mask value: i where the value equals labels[i],
+    len(labels) (the sentinel) for anything else.
+    """
+    n = labels.size
+    with np.errstate(invalid="ignore"):  # NaN casts are caught by `bad` below
+        vals = mask2d.astype(np.int64, copy=False)
+    bad = (vals != mask2d) if mask2d.dtype.kind == "f" else None  # fractional / NaN values
+
+    lo = min(int(labels[0]), 0)
+    span = int(labels[-1]) - lo + 1
+    if span <= _DENSE_LABEL_SPAN:
+        row_of = np.full(span + 1, n, dtype=np.intp)
+        row_of[labels - lo] = np.arange(n)
+        idx = vals - lo if lo else vals
+        out = (idx < 0) | (idx >= span)
+        if bad is not None:
+            out |= bad
+        if out.any():
+            idx = np.where(out, span, idx)
+        return row_of[idx]
+
+    rows = np.minimum(np.searchsorted(labels, vals), n - 1)
+    miss = labels[rows] != vals
+    if bad is not None:
+        miss |= bad
+    return np.where(miss, n, rows)
+
+
+def apply_multiclass_overlay_to_array(
+    base_arr: np.ndarray,
+    mask2d: np.ndarray,
+    label_colors: dict,
+    alpha: float = 0.35,
+    outline: bool = False,
+    label_visible: dict | None = None,
+) -> np.ndarray:
+    """
+    Apply multi-class overlay to a uint8 (H, W) or (H, W, 3) image; returns
+    (H, W, 3) uint8 (an RGB base_arr as-is when there is nothing to draw).
+    Safe fallback if only label=1 exists.
+    Only the bounding box of the labelled pixels is processed; filled regions
+    are one palette gather + one uint8 cv2.addWeighted blend for all labels,
+    written back through a masked copy.
+    """
+    base_arr = _as_rgb_u8(base_arr)
+
+    alpha = float(alpha)
+    mask2d = np.asarray(mask2d)
+    label_visible = label_visible or {}
+
+    if alpha == 0.0:
+        return base_arr
+
+    order, labels, colors = _label_lut(label_colors, label_visible)
+    if not order:
+        return base_arr
+
+    # Nothing to draw: empty slice (common while scrubbing)
+    nz = mask2d != 0
+    rows = np.flatnonzero(nz.any(axis=1))
+    if rows.size == 0:
+        return base_arr
+    cols = np.flatnonzero(nz.any(axis=0))
+
+    # Bounding box plus a 2 px margin, so Canny sees the same (zero)
+    # neighbourhood as on the full slice
+    h, w = mask2d.shape
+    roi = (
+        slice(max(int(rows[0]) - 2, 0), min(int(rows[-1]) + 3, h)),
+        slice(max(int(cols[0]) - 2, 0), min(int(cols[-1]) + 3, w)),
+    )
+
+    n = labels.size
+    idx = _label_rows(mask2d[roi], labels)
+    out = base_arr.copy()
+    sub = out[roi]  # view into out
+
+    if not outline:
+        on = idx != n
+        blended = cv2.addWeighted(sub, 1.0 - alpha, colors[idx], alpha, 0.0)
+        np.copyto(sub, blended, where=on[..., None])
+        return out
+
+    # Outlines: one Canny per label present (outlines of neighbouring labels
+    # can overlap, so they are blended label by label in label_colors order)
+    present = np.bincount(idx.ravel(), minlength=n + 1) > 0
+    for lbl_i in order:
+        row = int(np.searchsorted(labels, lbl_i))
+        if not present[row]:
             continue
+        region = (idx == row).view(np.uint8)
+        edges = cv2.Canny(region * 255, 50, 150) > 0
+        px = sub[edges].astype(np.float32)
+        sub[edges] = np.clip(np.rint((1.0 - alpha) * px + alpha * colors[row]), 0, 255)
+
+    return out
+
+
+def apply_multiclass_overlay_to_pil(
+    base_pil: Image.Image,
+    mask2d: np.ndarray,
+    label_colors: dict,
+    alpha: float = 0.35,
+    outline: bool = False,
+    label_visible: dict | None = None,
+):
+    """
+    PIL wrapper around apply_multiclass_overlay_to_array; returns an RGB image.
+    """
+    if base_pil.mode not in ("L", "RGB"):
+        base_pil = base_pil.convert("RGB")
 
-        if outline:
-            edges = cv2.Canny(region.astype(np.uint8) * 255, 50, 150)
-            region = edges > 0
+    arr = np.asarray(base_pil)
+    out = apply_multiclass_overlay_to_array(arr, mask2d, label_colors, alpha, outline, label_visible)
+    if out is arr:
+        return base_pil
+    return Image.fromarray(out)
 
-        base[region] = (1 - alpha) * base[region] + alpha * np.array(color)
 
-    return Image.fromarray(np.clip(base, 0, 255).astype(np.uint8))
+_LABEL_SCAN_CHUNK = 1 << 22  # voxels per bincount pass in _mask_labels
 
 
-def default_label_colormap(mask_vol: np.ndarray):
+def _mask_labels(mask_vol) -> np.ndarray:
+    """Sorted nonzero label values present in mask_vol."""
+    m = np.asarray(mask_vol)
+    # Small non-negative integer labels: one bincount pass instead of a full sort
+    if m.size and m.dtype.kind in "ui" and m.dtype.itemsize <= 4:
+        lo, hi = int(m.min()), int(m.max())
+        if lo >= 0 and hi < 65536:
+            flat = m.ravel()
+            counts = np.zeros(hi + 1, dtype=np.intp)
+            # Chunked so the intp copy bincount needs stays small for big volumes
+            for i in range(0, flat.size, _LABEL_SCAN_CHUNK):
+                chunk = flat[i:i + _LABEL_SCAN_CHUNK].astype(np.intp, copy=False)
+                counts += np.bincount(chunk, minlength=hi + 1)
+            labels = np.flatnonzero(counts)
+            return labels[labels != 0]
+
+    labels = np.unique(m)
+    return labels[labels != 0]
+
+
+def default_label_colormap(mask_vol: np.ndarray, cache_key=None):
     """
     Create a deterministic color map for labels found in the mask.
     Label 0 is ignored (background).
+
+    cache_key: optional hashable identifying mask_vol (e.g. path + mtime);
+    repeated calls with the same key skip the scan of the volume.
     """
     if mask_vol is None:
         return {}
 
-    labels = np.unique(mask_vol)
-    labels = labels[labels != 0]
+    if cache_key is not None and cache_key in _LABEL_CMAP_CACHE:
+        _LABEL_CMAP_CACHE.move_to_end(cache_key)
+        return dict(_LABEL_CMAP_CACHE[cache_key])
+
+    labels = _mask_labels(mask_vol)
 
     # Simple repeating color palette (safe & readable)
     palette = [
@@ -299,4 +531,6 @@ def default_label_colormap(mask_vol: np.ndarray):
     for i, lbl in enumerate(labels):
         color_map[int(lbl)] = palette[i % len(palette)]
 
+    if cache_key is not None:
+        _cache_put(_LABEL_CMAP_CACHE, cache_key, dict(color_map), LABEL_CMAP_CACHE_MAX)
     return color_map
@@ -1,8 +1,30 @@
 # utils.py
 
+import os
+
+import cv2
+import numpy as np
 from PIL import Image
 
 def save_as_png(img_array, output_path):
     """ Save NumPy array as PNG image """
-    img = Image.fromarray(img_array.astype("uint8"))
+    arr = np.asarray(img_array)
+    if arr.dtype != np.uint8:
+        arr = arr.astype("uint8")
+
+    # uint8 gray/RGB/RGBA goes straight to OpenCV's PNG writer (BGR order);
+    # PIL stays the fallback (e.g. for paths cv2.imwrite cannot open)
+    if os.path.splitext(output_path)[1].lower() == ".png":
+        if arr.ndim == 2:
+            bgr = arr
+        elif arr.ndim == 3 and arr.shape[2] == 3:
+            bgr = cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+        elif arr.ndim == 3 and arr.shape[2] == 4:
+            bgr = cv2.cvtColor(arr, cv2.COLOR_RGBA2BGRA)
+        else:
+            bgr = None
+        if bgr is not None and cv2.imwrite(output_path, bgr):
+            return
+
+    img = Image.fromarray(arr)
     img.save(output_path, format="PNG")
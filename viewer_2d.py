@@ -35,15 +35,15 @@ def create_2d_viewer(file_path, modality):
 
     # 3) Load the data array based on file_type
     if file_type == "DICOM":
-        full_data = image_loader.load_dicom(file_path).astype(np.float32)
+        full_data = image_loader.load_dicom(file_path).astype(np.float32, copy=False)
         if full_data.ndim == 2:
             full_data = np.expand_dims(full_data, axis=-1)
 
     elif file_type == "NIfTI":
-        arr_ = image_loader.load_nifti(file_path)
-        if arr_.ndim == 2:
-            arr_ = np.expand_dims(arr_, axis=-1)
-        full_data = arr_.astype(np.float32)
+        # Keep the (memory-mapped) on-disk dtype; slices are cast on display
+        full_data = image_loader.load_nifti(file_path)
+        if full_data.ndim == 2:
+            full_data = np.expand_dims(full_data, axis=-1)
 
     elif file_type == "JPEG/PNG":
         arr_ = image_loader.load_jpeg_png(file_path)
@@ -62,7 +62,7 @@ def create_2d_viewer(file_path, modality):
 
     # State
     state = {
-        "data": full_data,   # float32 up to 4D
+        "data": full_data,   # up to 4D; float32 or native NIfTI dtype
         "z_idx": 0,
         "t_idx": 0,
         "zoom_factor": 1.0,
@@ -199,7 +199,7 @@ def create_2d_viewer(file_path, modality):
         z_idx = state["z_idx"]
         t_idx = state["t_idx"]
         slice_2d = state["data"][:, :, z_idx, t_idx]
-        img_array = slice_2d.copy()
+        img_array = np.array(slice_2d, dtype=np.float32)
 
         # 2) Call all transformations from image_processing
         processed = image_processing.apply_all_processing(
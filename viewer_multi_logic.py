@@ -1,8 +1,8 @@
 # viewer_multi_logic.py
 
 import os
-import nibabel as nib
 import numpy as np
+import cv2
 import image_loader
 import image_processing
 
@@ -65,7 +65,8 @@ class MultiSliceTimeLogic:
                 arr = arr[..., np.newaxis]
             self.volume = arr
         elif file_type == "NIfTI":
-            vol = nib.load(path).get_fdata()
+            # On-disk (X, Y, Z[, T]) axes as with get_fdata(), but memory-mapped
+            vol = image_loader.load_nifti_voxels(path)
             if vol.ndim == 2:
                 vol = vol[..., np.newaxis, np.newaxis]
             elif vol.ndim == 3:
@@ -144,12 +145,11 @@ class MultiSliceTimeLogic:
         if self.volume is None:
             return None
 
-        slice_2d = self.volume[..., self.z_index, self.t_index]
-        # Normalize to [0..255]
-        min_val, max_val = slice_2d.min(), slice_2d.max()
-        if max_val != min_val:
-            slice_2d = (slice_2d - min_val) / (max_val - min_val) * 255
-        slice_2d = slice_2d.astype(np.float32)
+        # float32 copy of the slice: the volume may be a read-only memmap of any dtype
+        slice_src = np.ascontiguousarray(self.volume[..., self.z_index, self.t_index], dtype=np.float32)
+        # Normalize to [0..255] (fused min/max + scale; constant slices map to 0)
+        slice_2d = np.empty(slice_src.shape, dtype=np.float32)
+        cv2.normalize(slice_src, slice_2d, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_32F)
 
         # Apply processing
         out = image_processing.apply_all_processing(
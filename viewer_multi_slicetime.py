@@ -1,11 +1,14 @@
 # viewer_multi_slicetime.py
 
 import os
+import logging
+from collections import OrderedDict
 from pathlib import Path
 import json
 import tkinter as tk
 from tkinter import ttk, BooleanVar, IntVar, Checkbutton, Scale, filedialog, messagebox
 
+import cv2
 import nibabel as nib
 import numpy as np
 from PIL import Image, ImageTk
@@ -15,6 +18,25 @@ import image_processing
 import overlay_utils
 import ui_theme
 
+log = logging.getLogger(__name__)
+
+MASK_CACHE_MAX = 16  # display-size label slices (int32)
+OVERLAY_CACHE_MAX = 16  # display-size blended RGB images (uint8)
+
+
+def _lru_get(cache: OrderedDict, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache: OrderedDict, key, value, max_items: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_items:
+        cache.popitem(last=False)
+
 
 class CollapsibleSection(tk.Frame):
     def __init__(self, parent, title, theme=None, open_by_default=False):
@@ -204,6 +226,11 @@ def create_viewer(file_paths, modality="AUTO"):
         "is_ct": False
     }
 
+    # Recent display-size mask slices and blended overlays, so scrubbing back
+    # over a slice skips the mask pipeline and the blend; cleared on mask change
+    mask_cache = OrderedDict()
+    overlay_cache = OrderedDict()
+
     settings = {
         "hist_eq": BooleanVar(value=False),
         "colormap": BooleanVar(value=False),
@@ -239,8 +266,7 @@ def create_viewer(file_paths, modality="AUTO"):
             return 40, 400
 
         # Robust range
-        p1 = float(np.percentile(x, 1))
-        p99 = float(np.percentile(x, 99))
+        p1, p99 = (float(v) for v in np.percentile(x, [1, 99]))
 
         if p99 <= p1:
             mn = float(np.min(x))
@@ -776,10 +802,17 @@ def create_viewer(file_paths, modality="AUTO"):
 
         state["mask_path"] = mask_path
         state["mask_volume"] = m
+        mask_cache.clear()
+        overlay_cache.clear()
         state["overlay_enabled"] = True
         state["overlay_warned_mismatch"] = False
 
-        state["overlay_label_colors"] = overlay_utils.default_label_colormap(m)
+        try:
+            st = os.stat(mask_path)
+            cmap_key = (os.path.abspath(mask_path), st.st_mtime_ns, st.st_size)
+        except OSError:
+            cmap_key = None
+        state["overlay_label_colors"] = overlay_utils.default_label_colormap(m, cache_key=cmap_key)
         lc = state["overlay_label_colors"] or {}
         state["overlay_label_visible"] = {int(lbl): True for lbl in lc.keys()}
 
@@ -817,6 +850,8 @@ def create_viewer(file_paths, modality="AUTO"):
     def clear_mask():
         state["mask_path"] = None
         state["mask_volume"] = None
+        mask_cache.clear()
+        overlay_cache.clear()
         state["overlay_label_colors"] = None
         state["overlay_label_names"] = None
         state["overlay_label_visible"] = None
@@ -1207,11 +1242,12 @@ def create_viewer(file_paths, modality="AUTO"):
         c = float(center)
 
         lo = c - (w / 2.0)
-        hi = c + (w / 2.0)
 
-        out = (img_hu - lo) / (hi - lo)
-        out = np.clip(out, 0.0, 1.0) * 255.0
-        return out.astype(np.float32)
+        # (x - lo) * 255/w, clipped, in one float32 buffer
+        out = np.subtract(img_hu, lo, dtype=np.float32)
+        out *= np.float32(255.0 / w)
+        np.clip(out, 0.0, 255.0, out=out)
+        return out
 
     def _robust_normalize_to_8bit(x: np.ndarray, p_low: float = 1.0, p_high: float = 99.0) -> np.ndarray:
         """
@@ -1224,8 +1260,8 @@ def create_viewer(file_paths, modality="AUTO"):
         if x.size == 0:
             return np.zeros_like(x, dtype=np.float32)
 
-        lo = float(np.percentile(x, p_low))
-        hi = float(np.percentile(x, p_high))
+        # Both percentiles from one partition of the data
+        lo, hi = (float(v) for v in np.percentile(x, [p_low, p_high]))
 
         if hi <= lo:
             mn = float(np.min(x))
@@ -1234,9 +1270,11 @@ def create_viewer(file_paths, modality="AUTO"):
                 return np.zeros_like(x, dtype=np.float32)
             lo, hi = mn, mx
 
-        y = (x - lo) / (hi - lo)
-        y = np.clip(y, 0.0, 1.0) * 255.0
-        return y.astype(np.float32)
+        # nan_to_num already returned a private copy: normalize it in place
+        x -= np.float32(lo)
+        x *= np.float32(255.0 / (hi - lo))
+        np.clip(x, 0.0, 255.0, out=x)
+        return x
 
     def _is_rgb_volume(vol, ft) -> bool:
         return (
@@ -1298,6 +1336,10 @@ def create_viewer(file_paths, modality="AUTO"):
                 plane_var.set("Axial")
 
     # Display pipeline
+    # Keeps the pre-zoom image between redraws (pan/zoom only redo the warp);
+    # its result is clipped/copied right away
+    display_pipeline = image_processing.PipelineCache()
+
     def build_display_image():
         vol = state["volume"]
         if vol is None:
@@ -1310,6 +1352,7 @@ def create_viewer(file_paths, modality="AUTO"):
         ft = state["current_file_type"]
         is_rgb = (ft in ["JPEG/PNG", "TIFF"] and vol.ndim == 3 and vol.shape[2] == 3)
 
+        eq_key = None
         if is_rgb:
             slice_2d = vol.astype(np.float32)
         else:
@@ -1353,12 +1396,20 @@ def create_viewer(file_paths, modality="AUTO"):
                 c = float(settings["wl_center"].get())
                 wwl = float(settings["wl_width"].get())
                 slice_2d = _apply_window_level_to_8bit(slice_src, c, wwl)
+                wl_key = (c, wwl)
             else:
                 # Robust normalization (stable across slices, less outlier-sensitive)
                 slice_2d = _robust_normalize_to_8bit(slice_src, p_low=1.0, p_high=99.0)
+                wl_key = None
 
-        out = image_processing.apply_all_processing(
-            slice_2d,
+            # Identifies slice_2d's content so slider drags reuse the hist-eq table
+            eq_key = (
+                file_paths[state["current_file_index"]],
+                ft == "NIfTI" and bool(settings["nifti_canonical"].get()),
+                plane, state["z_index"], state["t_index"], wl_key,
+            )
+
+        proc = dict(
             hist_eq=settings["hist_eq"].get(),
             brightness_contrast=settings["brightness_contrast"].get(),
             brightness=settings["brightness"].get(),
@@ -1369,6 +1420,7 @@ def create_viewer(file_paths, modality="AUTO"):
             pan_x=state["pan_x"],
             pan_y=state["pan_y"],
         )
+        out = display_pipeline.process(slice_2d, source_key=eq_key, **proc)
 
         out = np.clip(out, 0, 255).astype(np.uint8)
 
@@ -1382,58 +1434,77 @@ def create_viewer(file_paths, modality="AUTO"):
         new_w, new_h = max(1, int(w * scale)), max(1, int(h * scale))
         state["last_disp_scaled_wh"] = (new_w, new_h)
 
-        if out.ndim == 2:
-            pil = Image.fromarray(out, "L")
-        else:
-            pil = Image.fromarray(out, "RGB")
+        disp = out
+        if new_w < w and new_h < h:
+            # Shrinking to fit: area averaging on the uint8 array (no aliasing)
+            disp = cv2.resize(out, (new_w, new_h), interpolation=cv2.INTER_AREA)
 
-        if (new_w, new_h) != (w, h):
-            pil = pil.resize((new_w, new_h), Image.BILINEAR)
+        if disp.shape[1] != new_w or disp.shape[0] != new_h:
+            pil = Image.fromarray(disp, "L" if disp.ndim == 2 else "RGB")
+            disp = np.asarray(pil.resize((new_w, new_h), Image.BILINEAR))
 
         state["last_mask_scaled"] = None
 
         if state["overlay_enabled"] and state["mask_volume"] is not None:
             plane = state.get("view_plane", "Axial") if ft == "NIfTI" else "Axial"
-            m = _get_2d_slice(state["mask_volume"], plane, state["z_index"], state["t_index"])
-            m = np.nan_to_num(m)
-            m = np.rint(m).astype(np.int32)
-
-            mh, mw = m.shape[:2]
-            if (mw != w or mh != h) and not state.get("overlay_warned_mismatch", False):
-                state["overlay_warned_mismatch"] = True
-                print(f"[WARN] Mask shape {mw}x{mh} != image slice {w}x{h}. Resizing mask to match.")
-
-            m = overlay_utils.resize_mask_nearest(m, w, h)
-            m = image_processing.apply_zoom_and_pan_mask(m, state["zoom_factor"], state["pan_x"], state["pan_y"])
-            m = overlay_utils.resize_mask_nearest(m, new_w, new_h).astype(np.int32)
+            mask_key = (
+                plane, state["z_index"], state["t_index"], w, h,
+                state["zoom_factor"], state["pan_x"], state["pan_y"], new_w, new_h,
+            )
+            m = _lru_get(mask_cache, mask_key)
+            if m is None:
+                m = _get_2d_slice(state["mask_volume"], plane, state["z_index"], state["t_index"])
+                m = np.nan_to_num(m)
+                m = np.rint(m).astype(np.int32)
+
+                mh, mw = m.shape[:2]
+                if (mw != w or mh != h) and not state.get("overlay_warned_mismatch", False):
+                    state["overlay_warned_mismatch"] = True
+                    log.warning("Mask shape %dx%d != image slice %dx%d. Resizing mask to match.", mw, mh, w, h)
+
+                m = overlay_utils.resize_mask_nearest(m, w, h)
+                m = image_processing.apply_zoom_and_pan_mask(m, state["zoom_factor"], state["pan_x"], state["pan_y"])
+                m = overlay_utils.resize_mask_nearest(m, new_w, new_h).astype(np.int32)
+                _lru_put(mask_cache, mask_key, m, MASK_CACHE_MAX)
 
             state["last_mask_scaled"] = m
 
             alpha = float(state.get("overlay_alpha", 35)) / 100.0
 
+            # The blended image also depends on the base image (eq_key + display
+            # settings) and on the label colors/visibility; RGB files have no eq_key
+            lc = state["overlay_label_colors"]
+            vis = state.get("overlay_label_visible") or {}
+            overlay_key = (
+                mask_key,
+                eq_key if eq_key is not None else file_paths[state["current_file_index"]],
+                tuple(proc.values()),
+                alpha,
+                bool(state["overlay_outline"]),
+                None if lc is None else tuple((int(k), tuple(v)) for k, v in lc.items()),
+                tuple(vis.items()),
+            )
+            blended = _lru_get(overlay_cache, overlay_key)
+            if blended is not None:
+                return Image.fromarray(blended)
+
+            # Blend on the uint8 array; PIL only at the Tk boundary below
             if state["overlay_label_colors"] is None:
                 m_bin = overlay_utils.to_binary_mask(m)
-                pil = overlay_utils.apply_overlay_to_pil(pil, m_bin, alpha)
+                disp = overlay_utils.apply_overlay_to_array(disp, m_bin, alpha)
             else:
-                try:
-                    pil = overlay_utils.apply_multiclass_overlay_to_pil(
-                        pil,
-                        m,
-                        label_colors=state["overlay_label_colors"],
-                        alpha=alpha,
-                        outline=state["overlay_outline"],
-                        label_visible=state.get("overlay_label_visible"),
-                    )
-                except TypeError:
-                    pil = overlay_utils.apply_multiclass_overlay_to_pil(
-                        pil,
-                        m,
-                        label_colors=state["overlay_label_colors"],
-                        alpha=alpha,
-                        outline=state["overlay_outline"],
-                    )
-
-        return pil
+                disp = overlay_utils.apply_multiclass_overlay_to_array(
+                    disp,
+                    m,
+                    label_colors=state["overlay_label_colors"],
+                    alpha=alpha,
+                    outline=state["overlay_outline"],
+                    label_visible=state.get("overlay_label_visible"),
+                )
+
+            _lru_put(overlay_cache, overlay_key, disp, OVERLAY_CACHE_MAX)
+
+        return Image.fromarray(disp, "L" if disp.ndim == 2 else "RGB")
 
     def display_current_slice():
         pil_img = build_display_image()
@@ -1524,7 +1595,7 @@ def create_viewer(file_paths, modality="AUTO"):
             # Prefer series stacking, but always fallback to single-file load.
             try:
                 vol3d, meta_series, meta_dict = image_loader.load_dicom_series_from_file(path)
-                arr = vol3d  # (H,W,Z) float32
+                arr = vol3d  # (H,W,Z) int16 or float32 HU
                 state["dicom_meta"] = meta_dict
                 state["is_ct"] = (str(meta_dict.get("Modality", "")).upper() == "CT")
 
@@ -1545,7 +1616,7 @@ def create_viewer(file_paths, modality="AUTO"):
                 # Override metadata label with series-aware metadata
                 metadata_label.config(text=meta_series)
             except Exception as e:
-                print(f"[WARN] load_dicom_series_from_file failed: {e}. Falling back to single-file DICOM.")
+                log.warning("load_dicom_series_from_file failed: %s. Falling back to single-file DICOM.", e)
                 state["dicom_meta"] = None
                 state["is_ct"] = False
                 settings["wl_enabled"].set(False)
@@ -1553,7 +1624,7 @@ def create_viewer(file_paths, modality="AUTO"):
                 try:
                     arr = image_loader.load_dicom(path)  # your old single-file loader
                 except Exception as e2:
-                    print(f"[ERROR] Single-file DICOM load failed: {e2}")
+                    log.error("Single-file DICOM load failed: %s", e2)
                     arr = None
 
 
@@ -1661,7 +1732,7 @@ def create_viewer(file_paths, modality="AUTO"):
             try:
                 display_current_slice()
             except Exception as e:
-                print("[ERROR] display_current_slice on resize:", e)
+                log.error("display_current_slice on resize: %s", e)
 
         root.after(60, do_redraw)
 
@@ -1730,5 +1801,14 @@ def create_viewer(file_paths, modality="AUTO"):
     file_slider.set(0)
     load_current_file()
 
+    def on_close():
+        # Decoded volumes, headers and open slide handles are cached per file
+        # by image_loader; release this window's files (other viewers may
+        # still be showing theirs)
+        image_loader.clear_caches(file_paths)
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+
     root.after(200, lambda: main_pane.sashpos(0, int(root.winfo_width() * 0.72)))
     root.mainloop()